@@ -1,12 +1,99 @@
+import asyncio
+import functools
+import heapq
 import aiohttp
-from typing import List, Dict, Any, Optional
+import orjson
+from collections import OrderedDict, defaultdict
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Tuple
 import re
+import time
 import PTN
+from rapidfuzz import fuzz, process
+from backend.logger import logger
+
+
+_SEPARATORS = str.maketrans('._-', '   ')
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+# Whole-word replacements applied by _clean_title: common abbreviations and
+# roman numerals I-X (for sequels)
+_REPLACEMENTS = {
+    'dr': 'doctor',
+    'mr': 'mister',
+    'mrs': 'missus',
+    'st': 'saint',
+    'pt': 'part',
+    'viii': '8',
+    'vii': '7',
+    'vi': '6',
+    'ix': '9',
+    'iv': '4',
+    'v': '5',
+    'iii': '3',
+    'ii': '2',
+    'x': '10',
+    'i': '1',
+}
+# Longest first so e.g. 'viii' wins over 'vi' / 'v'
+_REPLACEMENT_RE = re.compile(
+    r'\b(' + '|'.join(sorted(_REPLACEMENTS, key=len, reverse=True)) + r')\b'
+)
+
+# Too common to narrow down library candidates
+_STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'of', 'in', 'on', 'at', 'to', 'for', 'with'})
+# Candidates are taken from the postings of this many of the rarest search words
+_PREFILTER_WORDS = 3
+# Search results remembered per Arr instance (see ArrClient._match_cache)
+_MATCH_CACHE_SIZE = 1024
+
+
+# Fast paths for the common release layouts - only title and year are needed for matching.
+# TV: "Show.Name.2019.S01E02..." (year optional), movies: "Movie.Name.2019.1080p..." (last year wins)
+_TV_RELEASE_RE = re.compile(
+    r'^(?P<title>.+?)(?:[. _-]+\(?(?P<year>(?:19|20)\d{2})\)?)?[. _-]+S\d{1,2}(?:E\d{1,3})?(?![a-z])',
+    re.IGNORECASE
+)
+_MOVIE_RELEASE_RE = re.compile(r'^(?P<title>.+)[. _-]+\(?(?P<year>(?:19|20)\d{2})\)?(?:[. _-]|$)')
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_release(title: str) -> Dict[str, Any]:
+    """Extract title/year from a release name, memoized - the same names are looked up over and over.
+    Tries one compiled regex per layout before falling back to the full PTN pipeline.
+    The returned dict is shared between callers and must not be modified."""
+    match = _TV_RELEASE_RE.match(title) or _MOVIE_RELEASE_RE.match(title)
+    if match:
+        parsed_title = match.group('title').replace('.', ' ').replace('_', ' ').strip(' -')
+        if len(parsed_title) >= 2:
+            year = match.group('year')
+            return {'title': parsed_title, 'year': int(year) if year else None}
+    return PTN.parse(title)
+
+
+@functools.lru_cache(maxsize=8192)
+def _clean_title(title: str) -> str:
+    """Clean a title for comparison (PTN already removes most junk).
+    Memoized - library titles are re-cleaned on every library refresh and rarely change."""
+    # Remove ALL punctuation and special characters, keep only letters, numbers, spaces
+    title = title.translate(_SEPARATORS)  # Replace separators with spaces
+    title = _PUNCTUATION_RE.sub('', title)  # Remove all punctuation (!, :, etc)
+    title = ' '.join(title.lower().split())  # Normalize spaces
+
+    # Normalize abbreviations and roman numerals in one pass
+    return _REPLACEMENT_RE.sub(lambda m: _REPLACEMENTS[m.group(1)], title)
 
 
 class ArrClient:
     """Client for Radarr/Sonarr API."""
 
+    __slots__ = (
+        'name', 'url', 'api_key', 'arr_type', 'category',
+        'enable_parsing_logging', 'enable_match_logging', 'enable_poster_logging',
+        'session', '_library_cache', '_library_ttl', '_library_lock', '_word_index', '_all_titles',
+        '_match_cache',
+    )
+
     def __init__(self, name: str, url: str, api_key: str, arr_type: str = "radarr", category: str = None,
                  enable_parsing_logging: bool = False, enable_match_logging: bool = False,
                  enable_poster_logging: bool = False):
@@ -18,144 +105,192 @@ class ArrClient:
         self.enable_parsing_logging = enable_parsing_logging
         self.enable_match_logging = enable_match_logging
         self.enable_poster_logging = enable_poster_logging
+        self.session: Optional[aiohttp.ClientSession] = None  # Shared, set by ArrManager.startup()
+        self._library_cache: Optional[Tuple[float, List[Dict[str, Any]]]] = None  # (fetched_at, items)
+        self._library_ttl = 30  # seconds
+        self._library_lock = asyncio.Lock()
+        self._word_index: Dict[str, set] = {}  # word -> indexes of library items whose title contains it
+        self._all_titles: Dict[int, str] = {}  # item index -> cleaned title, for unfiltered searches
+        # (clean title, year) -> match (or None) against the current library; LRU, emptied on refresh
+        self._match_cache: "OrderedDict[Tuple[str, Optional[int]], Optional[Dict[str, Any]]]" = OrderedDict()
 
     async def _make_request(self, endpoint: str) -> Any:
         """Make a request to Radarr/Sonarr API."""
-        headers = {
-            "X-Api-Key": self.api_key
-        }
-
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(f"{self.url}/api/v3/{endpoint}", headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status != 200:
-                        return None
-                    return await response.json()
-            except Exception as e:
-                print(f"Error connecting to {self.name}: {e}")
+        if self.session is None:
+            logger.write(f"Error connecting to {self.name}: HTTP session not started")
+            return None
+        try:
+            async with self.session.get(f"{self.url}/api/v3/{endpoint}", headers={"X-Api-Key": self.api_key}) as response:
+                if response.status != 200:
+                    return None
+                return orjson.loads(await response.read())
+        except Exception as e:
+            logger.write(f"Error connecting to {self.name}: {e}")
+            return None
+
+    async def _get_library(self) -> Optional[List[Dict[str, Any]]]:
+        """Get all movies/series, cached for a short TTL so each search doesn't re-download the library."""
+        if self._library_fresh():
+            return self._library_cache[1]
+
+        # Concurrent searches on an expired cache share a single fetch
+        async with self._library_lock:
+            if self._library_fresh():
+                return self._library_cache[1]
+
+            if self.arr_type == "radarr":
+                items = await self._make_request("movie")
+            else:
+                items = await self._make_request("series")
+
+            if not items:
                 return None
 
+            # Clean library titles once per fetch instead of once per search
+            word_index = defaultdict(set)
+            for idx, item in enumerate(items):
+                item["_clean_title"] = _clean_title(item.get("title", ""))
+                for word in item["_clean_title"].split():
+                    if word not in _STOP_WORDS:
+                        word_index[word].add(idx)
+
+            self._word_index = dict(word_index)
+            self._all_titles = {idx: item["_clean_title"] for idx, item in enumerate(items)}
+            self._match_cache.clear()  # Matches (and misses) were against the old library
+            self._library_cache = (time.monotonic(), items)
+            return items
+
+    def _library_fresh(self) -> bool:
+        """Whether the cached library is still within its TTL."""
+        return self._library_cache is not None and time.monotonic() - self._library_cache[0] < self._library_ttl
+
     async def search_by_title(self, title: str) -> Optional[Dict[str, Any]]:
         """Search for a movie/show by title using multi-stage matching."""
-        # Parse release name using PTN to extract clean title
-        parsed = PTN.parse(title)
+        # Parse release name to extract clean title (PTN fallback is regex-heavy, so off the event loop)
+        parsed = await asyncio.to_thread(_parse_release, title)
 
         # Get parsed title and year
         parsed_title = parsed.get('title', title)
         download_year = parsed.get('year')
 
         if self.enable_parsing_logging:
-            print(f"[PTN Parse] Raw: '{title}' -> Title: '{parsed_title}', Year: {download_year}")
+            logger.write(f"[PTN Parse] Raw: '{title}' -> Title: '{parsed_title}', Year: {download_year}")
 
         # Clean the parsed title for better matching
-        clean_title = self._clean_title(parsed_title)
+        clean_title = _clean_title(parsed_title)
         if self.enable_match_logging:
-            print(f"[Match Debug] Cleaned search title: '{clean_title}'")
+            logger.write(f"[Match Debug] Cleaned search title: '{clean_title}'")
 
         # Get all items from Radarr/Sonarr
-        if self.arr_type == "radarr":
-            items = await self._make_request("movie")
-        else:
-            items = await self._make_request("series")
+        items = await self._get_library()
 
         if not items:
             return None
 
+        # Episodes of one show clean to the same title - reuse the match until the library refreshes
+        cache_key = (clean_title, download_year)
+        if cache_key in self._match_cache:
+            self._match_cache.move_to_end(cache_key)
+            if self.enable_match_logging:
+                logger.write(f"[Match Debug] Cached result for '{clean_title}' in {self.name}")
+            return self._match_cache[cache_key]
+
+        result = await self._match(clean_title, download_year, items)
+        if self._library_cache is not None and self._library_cache[1] is items:  # Not refreshed meanwhile
+            self._match_cache[cache_key] = result
+            if len(self._match_cache) > _MATCH_CACHE_SIZE:
+                self._match_cache.popitem(last=False)
+        return result
+
+    async def _match(self, clean_title: str, download_year: Optional[int],
+                     items: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Find the best library match for a cleaned title."""
         if self.enable_match_logging:
-            print(f"[Match Debug] Searching {len(items)} items in {self.name}")
-
-        # Build list of candidates with match scores
+            logger.write(f"[Match Debug] Searching {len(items)} items in {self.name}")
+            logger.write(f"[Match Debug] Sample titles in library: {[item.get('title', '') for item in items[:3]]}")
+
+        # Score the closest few titles in one rapidfuzz call.
+        # Runs in a worker thread so large libraries don't stall API requests on the event loop.
+        matches = await asyncio.to_thread(
+            process.extract,
+            clean_title,
+            self._candidate_titles(clean_title, items, download_year),
+            scorer=fuzz.WRatio,
+            score_cutoff=60,
+            limit=5
+        )
+
+        # Score candidates (title similarity adjusted by year) as (score, item index) pairs
         candidates = []
-        all_titles_sample = []
-
-        for item in items:
-            item_title_raw = item.get("title", "")
-            item_title = self._clean_title(item_title_raw)
-            item_year = item.get("year")
-
-            # Keep first 3 titles for debugging
-            if self.enable_match_logging and len(all_titles_sample) < 3:
-                all_titles_sample.append(item_title_raw)
+        for item_title, title_score, idx in matches:
+            score = self._calculate_match_score(clean_title, item_title, title_score, download_year, items[idx].get("year"))
+            if score > 0:
+                candidates.append((score, idx))
 
-            # Calculate match score
-            score = self._calculate_match_score(clean_title, item_title, download_year, item_year)
+        if not candidates:
+            if self.enable_match_logging:
+                logger.write(f"[Match Debug] No candidates with title similarity >= 60")
+            return None
 
-            if score > 0:
-                candidates.append({
-                    "item": item,
-                    "score": score,
-                    "title": item_title_raw
-                })
+        # Show top 3 candidates
+        if self.enable_match_logging:
+            for rank, (score, idx) in enumerate(heapq.nlargest(3, candidates, key=itemgetter(0))):
+                logger.write(f"[Match Debug] Top candidate #{rank+1}: '{items[idx].get('title', '')}' - Score: {score}")
 
-        # Show sample of library titles
+        # Highest score wins (first one on ties)
+        best_score, best_idx = max(candidates, key=itemgetter(0))
         if self.enable_match_logging:
-            print(f"[Match Debug] Sample titles in library: {all_titles_sample}")
-
-        # Show top 3 candidates if any
-        if self.enable_match_logging and candidates:
-            candidates.sort(key=lambda x: x["score"], reverse=True)
-            for idx, c in enumerate(candidates[:3]):
-                print(f"[Match Debug] Top candidate #{idx+1}: '{c['title']}' - Score: {c['score']}")
-
-        # Sort by score (highest first) and return best match
-        if candidates:
-            candidates.sort(key=lambda x: x["score"], reverse=True)
-            best_match = candidates[0]
-            if self.enable_match_logging:
-                print(f"[Match Debug] Best match: '{best_match['title']}' with score {best_match['score']}")
+            logger.write(f"[Match Debug] Best match: '{items[best_idx].get('title', '')}' with score {best_score}")
 
-            # Only return if score meets minimum threshold
-            if best_match["score"] >= 60:  # Minimum 60% match
-                return self._format_item(best_match["item"])
-            else:
-                if self.enable_match_logging:
-                    print(f"[Match Debug] Best score {best_match['score']} is below threshold of 60")
-        else:
-            if self.enable_match_logging:
-                print(f"[Match Debug] No candidates with score > 0")
+        # Only return if score meets minimum threshold
+        if best_score >= 60:  # Minimum 60% match
+            return self._format_item(items[best_idx])
 
+        if self.enable_match_logging:
+            logger.write(f"[Match Debug] Best score {best_score} is below threshold of 60")
         return None
 
-    def _calculate_match_score(self, download_title: str, item_title: str, download_year: Optional[int], item_year: Optional[int]) -> int:
+    def _candidate_titles(self, clean_title: str, items: List[Dict[str, Any]],
+                          download_year: Optional[int] = None) -> Dict[int, str]:
+        """Library titles worth scoring, keyed by item index.
+        Only items sharing one of the rarest search words are kept; falls back to the whole
+        library when no search word appears in it. Items more than a year off are dropped,
+        since the year penalty keeps them below the match threshold anyway."""
+        search_words = {word for word in clean_title.split() if word not in _STOP_WORDS}
+        postings = sorted(
+            (self._word_index[word] for word in search_words if word in self._word_index),
+            key=len
+        )[:_PREFILTER_WORDS]
+
+        if not postings:
+            return self._all_titles
+
+        candidates = set().union(*postings)
+        if download_year:
+            candidates = {
+                idx for idx in candidates
+                if not items[idx].get("year") or abs(items[idx]["year"] - download_year) <= 1
+            }
+        if self.enable_match_logging:
+            logger.write(f"[Match Debug] Pre-filter kept {len(candidates)} of {len(items)} items")
+        return {idx: items[idx]["_clean_title"] for idx in candidates}
+
+    def _calculate_match_score(self, download_title: str, item_title: str, title_score: float,
+                               download_year: Optional[int], item_year: Optional[int]) -> int:
         """
         Calculate match score between download title and media item.
+        title_score is the rapidfuzz WRatio similarity of the cleaned titles.
         Returns score from 0-100, where 100 is perfect match.
         """
         if not download_title or not item_title:
             return 0
 
-        score = 0
-
         # Stage 1: Exact match (100 points)
         if download_title == item_title:
             score = 100
         else:
-            # Stage 2: Word-based matching
-            download_words = set(download_title.split())
-            item_words = set(item_title.split())
-
-            # Remove very common words that don't help matching
-            stop_words = {'the', 'a', 'an', 'of', 'and', 'or', 'in', 'to', 'for'}
-            download_words = download_words - stop_words
-            item_words = item_words - stop_words
-
-            if not download_words or not item_words:
-                return 0
-
-            # Calculate word overlap percentage
-            common_words = download_words & item_words
-            word_overlap = len(common_words) / max(len(download_words), len(item_words))
-
-            # Require significant word overlap
-            if word_overlap < 0.5:  # At least 50% word overlap
-                return 0
-
-            # Base score on word overlap (0-70 points)
-            score = int(word_overlap * 70)
-
-            # Bonus: All item words present in download (important for short titles)
-            if item_words.issubset(download_words):
-                score += 20
+            # Stage 2: Fuzzy title similarity (handles word reordering and partial titles)
+            score = int(title_score)
 
         # Stage 3: Year matching bonus (up to +30 points or -50 penalty)
         if download_year and item_year:
@@ -168,43 +303,6 @@ class ArrClient:
 
         return max(0, min(100, score))  # Clamp to 0-100
 
-    def _clean_title(self, title: str) -> str:
-        """Clean a title for comparison (PTN already removes most junk)."""
-        # Remove ALL punctuation and special characters, keep only letters, numbers, spaces
-        title = re.sub(r'[._-]', ' ', title)  # Replace separators with spaces
-        title = re.sub(r'[^\w\s]', '', title)  # Remove all punctuation (!, :, etc)
-        title = re.sub(r'\s+', ' ', title).strip().lower()  # Normalize spaces
-
-        # Normalize common abbreviations (case-insensitive)
-        abbreviations = {
-            r'\bdr\b': 'doctor',
-            r'\bmr\b': 'mister',
-            r'\bmrs\b': 'missus',
-            r'\bst\b': 'saint',
-            r'\bpt\b': 'part',
-        }
-        for abbr, full in abbreviations.items():
-            title = re.sub(abbr, full, title)
-
-        # Convert roman numerals to arabic numbers (I-X for sequels)
-        # Order matters! Check longer patterns first (VIII before III before II before I)
-        roman_map = [
-            (r'\bviii\b', '8'),
-            (r'\bvii\b', '7'),
-            (r'\bvi\b', '6'),
-            (r'\bix\b', '9'),
-            (r'\biv\b', '4'),
-            (r'\bv\b', '5'),
-            (r'\biii\b', '3'),
-            (r'\bii\b', '2'),
-            (r'\bx\b', '10'),
-            (r'\bi\b', '1'),
-        ]
-        for roman, arabic in roman_map:
-            title = re.sub(roman, arabic, title)
-
-        return title
-
     def _format_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
         """Format item data into standardized format."""
         if self.arr_type == "radarr":
@@ -252,6 +350,7 @@ class ArrManager:
                  enable_category_logging: bool = False, enable_parsing_logging: bool = False,
                  enable_match_logging: bool = False, enable_poster_logging: bool = False):
         self.clients = []
+        self.session: Optional[aiohttp.ClientSession] = None
         self.enable_category_logging = enable_category_logging
         self.enable_poster_logging = enable_poster_logging
 
@@ -269,7 +368,7 @@ class ArrManager:
             )
             self.clients.append(client)
             if enable_category_logging:
-                print(f"[Category Config] Loaded {client.name} with category: {client.category}")
+                logger.write(f"[Category Config] Loaded {client.name} with category: {client.category}")
 
         # Initialize Sonarr clients
         for config in sonarr_configs:
@@ -285,35 +384,79 @@ class ArrManager:
             )
             self.clients.append(client)
             if enable_category_logging:
-                print(f"[Category Config] Loaded {client.name} with category: {client.category}")
+                logger.write(f"[Category Config] Loaded {client.name} with category: {client.category}")
+
+        # Category -> instances handling it, in config order
+        self._by_category: Dict[str, List[ArrClient]] = {}
+        for client in self.clients:
+            if client.category:
+                self._by_category.setdefault(client.category, []).append(client)
+
+    async def startup(self):
+        """Open the keep-alive HTTP session shared by all instances."""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=100,
+                    limit_per_host=10,
+                    ttl_dns_cache=600,
+                    keepalive_timeout=60,
+                    enable_cleanup_closed=True
+                ),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        for client in self.clients:
+            client.session = self.session
+
+    async def warm(self):
+        """Fetch every instance's library concurrently so the first poster searches hit a warm cache."""
+        await asyncio.gather(*(client._get_library() for client in self.clients), return_exceptions=True)
+
+    async def close(self):
+        """Close the shared HTTP session."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        for client in self.clients:
+            client.session = None
 
     async def search_all(self, title: str, category: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Search specific Radarr/Sonarr instance based on category.
-        NO FALLBACK - only searches the instance where category matches.
+        NO FALLBACK - only searches instances where category matches.
         """
         if not category:
             # No category = no search
             return None
 
+        # Find the clients that handle this category
+        matching = self._by_category.get(category, [])
         if self.enable_category_logging:
-            print(f"[Category Match] Looking for category '{category}' among {len(self.clients)} instances")
+            logger.write(f"[Category Match] Category '{category}' -> {[client.name for client in matching]} ({len(self.clients)} instances configured)")
 
-        # Find the client that handles this category
-        for client in self.clients:
-            if self.enable_category_logging:
-                print(f"[Category Match] Checking {client.name}: client.category='{client.category}' vs search='{category}' | Match: {client.category == category}")
-            if client.category and client.category == category:
-                if self.enable_poster_logging:
-                    print(f"[Poster Match] Searching '{client.name}' for '{title}' (category: {category})")
-                result = await client.search_by_title(title)
-                if self.enable_poster_logging:
-                    if result:
-                        print(f"[Poster Match] ✓ Found in '{client.name}': {result.get('media_title')}")
-                    else:
-                        print(f"[Poster Match] ✗ Not found in '{client.name}'")
-                return result
-
-        # No instance configured for this category
+        if not matching:
+            # No instance configured for this category
+            if self.enable_poster_logging:
+                logger.write(f"[Poster Match] ⚠️  No instance configured for category '{category}'")
+            return None
+
+        if len(matching) == 1:
+            return await self._search_client(matching[0], title, category)
+
+        # Several instances share the category - search them concurrently, first configured hit wins
+        results = await asyncio.gather(
+            *(self._search_client(client, title, category) for client in matching),
+            return_exceptions=True
+        )
+        return next((r for r in results if r and not isinstance(r, BaseException)), None)
+
+    async def _search_client(self, client: ArrClient, title: str, category: str) -> Optional[Dict[str, Any]]:
+        """Search one instance, with poster match logging."""
         if self.enable_poster_logging:
-            print(f"[Poster Match] ⚠️  No instance configured for category '{category}'")
-        return None
+            logger.write(f"[Poster Match] Searching '{client.name}' for '{title}' (category: {category})")
+        result = await client.search_by_title(title)
+        if self.enable_poster_logging:
+            if result:
+                logger.write(f"[Poster Match] ✓ Found in '{client.name}': {result.get('media_title')}")
+            else:
+                logger.write(f"[Poster Match] ✗ Not found in '{client.name}'")
+        return result
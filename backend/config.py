@@ -1,8 +1,12 @@
+import threading
 import yaml
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel
 
+# libyaml's C loader when PyYAML was built with it, pure-Python otherwise
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 class SABnzbdConfig(BaseModel):
     url: str
@@ -32,6 +36,7 @@ class DebugConfig(BaseModel):
     enable_poster_logging: bool = False
     enable_parsing_logging: bool = False
     enable_match_logging: bool = False
+    verbose_logging: bool = True
 
 
 class Config(BaseModel):
@@ -43,8 +48,13 @@ class Config(BaseModel):
     debug: DebugConfig = DebugConfig()
 
 
+# Parsed configs keyed by resolved path -> ((mtime_ns, size, inode), Config)
+_file_cache: Dict[str, Tuple[Tuple[int, int, int], Config]] = {}
+_file_cache_lock = threading.Lock()
+
+
 def load_config(config_path: str = "config.yml") -> Config:
-    """Load configuration from YAML file."""
+    """Load configuration from YAML file (re-parsed only when the file changes)."""
     path = Path(config_path)
 
     if not path.exists():
@@ -53,19 +63,24 @@ def load_config(config_path: str = "config.yml") -> Config:
             "Please copy config.example.yml to config.yml and configure it."
         )
 
-    with open(path, 'r') as f:
-        data = yaml.safe_load(f)
+    st = path.stat()
+    key = str(path.resolve())
+    file_id = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    cached = _file_cache.get(key)
+    if cached and cached[0] == file_id:
+        return cached[1]
 
-    return Config(**data)
+    with open(path, 'r') as f:
+        data = yaml.load(f, Loader=_YAML_LOADER)
 
+    config = Config(**data)
+    with _file_cache_lock:
+        _file_cache[key] = (file_id, config)
 
-# Global config instance
-_config: Optional[Config] = None
+    return config
 
 
 def get_config() -> Config:
-    """Get the global config instance."""
-    global _config
-    if _config is None:
-        _config = load_config()
-    return _config
+    """Get the global config instance (cached by load_config until config.yml changes on disk)."""
+    return load_config()
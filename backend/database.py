@@ -1,24 +1,63 @@
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, Text, create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from typing import AsyncIterator
+from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, Text, Index, event, text
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
-Base = declarative_base()
+class Base(DeclarativeBase):
+    pass
+
+# Storage units: sizes are integer bytes, speed is integer KiB/s (the API reports MB and MB/s)
+BYTES_PER_MB = 1024 * 1024
+KIB_PER_MB = 1024
+
+# Bumped when existing data or indexes need converting - stored in SQLite's PRAGMA user_version
+SCHEMA_VERSION = 2
+
+# Applied to every new SQLite connection - WAL lets API reads proceed while the sync job writes
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "cache_size=-64000",  # 64 MB page cache
+    "temp_store=MEMORY",
+    "mmap_size=268435456",  # 256 MB
+    "foreign_keys=ON",
+)
 
 
 class Download(Base):
     __tablename__ = "downloads"
+    __table_args__ = (
+        Index("ix_downloads_status_updated", "status", "updated_at"),  # status lookups + recency
+        Index("ix_downloads_status_completed", "status", "completed_at"),  # cleanup cutoff, newest-completed first
+        Index("ix_downloads_failed", "failed"),
+        # Partial index holding only the rows still waiting for a poster fetch, by tier and queue order
+        Index(
+            "ix_downloads_poster_pending",
+            "status",
+            "queue_position",
+            sqlite_where=text("poster_url IS NULL AND poster_attempted = 0"),
+        ),
+        # Partial index holding only the rows reset-poster-flags touches
+        Index(
+            "ix_downloads_reset",
+            "poster_attempted",
+            sqlite_where=text("poster_url IS NULL AND poster_attempted = 1"),
+        ),
+    )
 
     id = Column(String, primary_key=True)  # SABnzbd NZO ID
     name = Column(String, nullable=False)
     status = Column(String, nullable=False)  # downloading, queued, completed, failed
     detailed_status = Column(String, nullable=True)  # Actual SABnzbd status (Downloading, Extracting, Verifying, etc.)
     progress = Column(Float, default=0.0)  # 0-100
-    size_total = Column(Float, nullable=True)  # in MB
-    size_left = Column(Float, nullable=True)  # in MB
+    size_total = Column(Integer, nullable=True)  # in bytes
+    size_left = Column(Integer, nullable=True)  # in bytes
     time_left = Column(String, nullable=True)
-    speed = Column(Float, nullable=True)  # MB/s
+    speed = Column(Integer, nullable=True)  # KiB/s
     category = Column(String, nullable=True)
     priority = Column(String, nullable=True)  # Force, High, Normal, Low
     queue_position = Column(Integer, nullable=True)  # Position in queue (1, 2, 3...)
@@ -47,21 +86,95 @@ class Download(Base):
 
 class AsyncDatabase:
     def __init__(self, database_url: str = "sqlite+aiosqlite:///./media_tracker.db"):
-        self.engine = create_async_engine(database_url, echo=False)
+        is_sqlite = database_url.startswith("sqlite")
+        # Keep a fixed set of connections open instead of reopening the .db/-wal/-shm files
+        self.engine = create_async_engine(
+            database_url,
+            echo=False,
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=5,
+            max_overflow=0,
+            pool_timeout=30,
+            # Wait up to 30s on a locked database instead of failing with "database is locked"
+            connect_args={"timeout": 30} if is_sqlite else {},
+        )
+        if is_sqlite:
+            event.listen(self.engine.sync_engine, "connect", self._set_sqlite_pragmas)
         self.async_session = async_sessionmaker(
             self.engine, class_=AsyncSession, expire_on_commit=False
         )
+        # SQLite allows one writer at a time - queue background writers here instead of
+        # letting them collide and fail with "database is locked"
+        self._write_sem = asyncio.Semaphore(1)
+
+    @staticmethod
+    def _set_sqlite_pragmas(dbapi_conn, connection_record):
+        """Tune SQLite for concurrent reads during background sync writes."""
+        cursor = dbapi_conn.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
 
     async def init_db(self):
         """Initialize database tables."""
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            # create_all() skips tables that already exist, so add new indexes to older databases
+            await conn.run_sync(self._create_missing_indexes)
+            await conn.run_sync(self._migrate)
+
+    @staticmethod
+    def _create_missing_indexes(conn):
+        """Create any model indexes missing from an existing database (CREATE INDEX IF NOT EXISTS)."""
+        for index in Download.__table__.indexes:
+            index.create(conn, checkfirst=True)
 
-    async def get_session(self) -> AsyncSession:
-        """Get a database session."""
-        async with self.async_session() as session:
-            yield session
+    @staticmethod
+    def _migrate(conn):
+        """One-shot data migrations for databases created by older versions."""
+        if conn.dialect.name != "sqlite":
+            return
+
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        if version < 1:
+            # v1: sizes/speed moved from float MB and MB/s to integer bytes and KiB/s.
+            # SQLite keeps a column's declared type, so an UPDATE alone would store the
+            # converted values as REAL again - rebuild the table with INTEGER columns instead.
+            column_types = {row[1]: row[2] for row in conn.exec_driver_sql("PRAGMA table_info(downloads)")}
+            if column_types.get("size_total", "").upper() != "INTEGER":
+                AsyncDatabase._rebuild_downloads(conn, column_types)
+        if version < 2:
+            # v2: ix_downloads_poster_pending replaced the full (poster_attempted, poster_url) index
+            conn.exec_driver_sql("DROP INDEX IF EXISTS ix_downloads_poster_attempt")
+        if version < SCHEMA_VERSION:
+            conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @staticmethod
+    def _rebuild_downloads(conn, old_columns):
+        """Recreate the downloads table from the model and copy the rows over, scaling MB floats to integer units."""
+        scale = {"size_total": BYTES_PER_MB, "size_left": BYTES_PER_MB, "speed": KIB_PER_MB}
+        names = [c.name for c in Download.__table__.columns if c.name in old_columns]
+        values = [f"CAST(ROUND({name} * {scale[name]}) AS INTEGER)" if name in scale else name for name in names]
+
+        # The renamed table keeps its index names, so drop them before the model's indexes are created
+        conn.exec_driver_sql("ALTER TABLE downloads RENAME TO downloads_old")
+        for _, index_name, _, origin, _ in conn.exec_driver_sql("PRAGMA index_list(downloads_old)").all():
+            if origin == "c":
+                conn.exec_driver_sql(f'DROP INDEX "{index_name}"')
+        Download.__table__.create(conn)
+        conn.exec_driver_sql(
+            f"INSERT INTO downloads ({', '.join(names)}) SELECT {', '.join(values)} FROM downloads_old"
+        )
+        conn.exec_driver_sql("DROP TABLE downloads_old")
+
+    @asynccontextmanager
+    async def writer_session(self) -> AsyncIterator[AsyncSession]:
+        """Get a database session for jobs that modify data (one writer at a time)."""
+        async with self._write_sem:
+            async with self.async_session() as session:
+                yield session
 
 
 # Global database instance
 db = AsyncDatabase()
+
@@ -2,66 +2,154 @@
 Enhanced logging system for SABnzbd Media Tracker.
 Provides beautiful, informative logs with progress tracking.
 """
+from collections import OrderedDict
 from datetime import datetime
 from typing import List, Dict, Optional
+import atexit
+import functools
 import math
+import queue
+import sys
+import threading
+import time
+
+# Downloads whose last logged progress is remembered
+PROGRESS_TRACK_LIMIT = 1024
+
+# Shared tail of every "Queue update" line, filled from the (downloading, queued, completed) tuple
+_FMT_QUEUE_COUNTS = "Downloading: %d, Queued: %d, Completed: %d"
+
+
+@functools.lru_cache(maxsize=64)
+def _rule(char: str, count: int) -> str:
+    """A run of `count` copies of `char`, built once per (char, count) - box edges, separators, bars."""
+    return char * count
+
+
+def _batched(method):
+    """Collect every line a log method prints and hand them to the writer thread as one chunk."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        outermost = self._buf is None  # Nested log calls share the caller's buffer
+        if outermost:
+            self._buf = []
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            if outermost:
+                lines, self._buf = self._buf, None
+                if lines:
+                    self._queue.put("\n".join(lines) + "\n")
+    return wrapper
 
 
 class Logger:
     """Enhanced logger with smart formatting and progress tracking."""
 
     def __init__(self):
-        self.last_sync_state = None
-        self.last_download_progress = {}
-        self.poster_fetch_start_time = None
+        self.last_sync_state = None  # (downloading, queued, completed)
+        self.last_download_progress: "OrderedDict[str, float]" = OrderedDict()  # LRU, capped at PROGRESS_TRACK_LIMIT
+        self.poster_fetch_start_time: Optional[float] = None  # time.monotonic() at batch start
         self.total_posters_needed = 0
         self.milestones_hit = set()
-        self.errors_buffer = []
+        self.error_counts: Dict[str, Dict] = {}  # message -> {'count', 'contexts'} since the last summary
+        self.error_total = 0
         self.last_error_report = datetime.now()
+        self._buf: Optional[List[str]] = None  # Lines pending for the current log call
+        self._ts_sec = -1  # Second the cached timestamp string was formatted for
+        self._ts_str = ""
+        self.verbose = True  # Per-item detail lines in batch summaries (config.yml -> debug.verbose_logging)
+        # stdout writes happen on a background thread so log bursts never block the event loop
+        self._queue: "queue.SimpleQueue[Optional[str]]" = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._drain, name="log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _drain(self) -> None:
+        """Writer thread: write queued chunks to stdout, one flush per burst."""
+        while True:
+            chunk = self._queue.get()
+            chunks = []
+            while chunk is not None:
+                chunks.append(chunk)
+                try:
+                    chunk = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if chunks:
+                sys.stdout.write("".join(chunks))
+                sys.stdout.flush()
+            if chunk is None:
+                return
+
+    def close(self) -> None:
+        """Flush pending output and stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def _print(self, line: str = "") -> None:
+        """Queue a line for the current batched log call (or hand it to the writer thread directly)."""
+        if self._buf is not None:
+            self._buf.append(line)
+        else:
+            self._queue.put(line + "\n")
 
-    def timestamp(self) -> str:
-        """Get formatted timestamp."""
-        return f"[{datetime.now().strftime('%H:%M:%S')}]"
+    def write(self, line: str = "") -> None:
+        """Log a plain line - use instead of print() so output stays in order with the rest of the log."""
+        self._print(line)
 
+    def timestamp(self) -> str:
+        """Get formatted timestamp (re-formatted only when the second changes)."""
+        now = int(time.time())
+        if now != self._ts_sec:
+            self._ts_sec = now
+            self._ts_str = f"[{time.strftime('%H:%M:%S', time.localtime(now))}]"
+        return self._ts_str
+
+    @_batched
     def draw_box(self, title: str, width: int = 78) -> None:
         """Draw a box around text."""
-        print("╔" + "═" * (width - 2) + "╗")
+        edge = _rule("═", width - 2)
         padding = (width - 2 - len(title)) // 2
-        print("║" + " " * padding + title + " " * (width - 2 - padding - len(title)) + "║")
-        print("╚" + "═" * (width - 2) + "╝")
+        self._print(f"╔{edge}╗")
+        self._print(f"║{_rule(' ', padding)}{title}{_rule(' ', max(0, width - 2 - padding - len(title)))}║")
+        self._print(f"╚{edge}╝")
 
+    @_batched
     def separator(self, width: int = 80) -> None:
         """Print a separator line."""
-        print("-" * width)
+        self._print(_rule("-", width))
 
     def progress_bar(self, current: int, total: int, width: int = 30, fill: str = "█", empty: str = "░") -> str:
         """Generate ASCII progress bar."""
         if total == 0:
-            return f"[{empty * width}]"
+            return f"[{_rule(empty, width)}]"
 
-        percent = current / total
-        filled = int(width * percent)
-        bar = fill * filled + empty * (width - filled)
-        return f"[{bar}]"
+        filled = min(width, int(width * current / total))
+        return f"[{_rule(fill, width)[:filled]}{_rule(empty, width)[filled:]}]"
 
+    @_batched
     def startup_banner(self, config) -> None:
         """Print startup banner with connection info."""
-        print("=" * 80)
-        print("SABnzbd Media Tracker v1.0 - STARTED")
-        print("=" * 80)
-        print()
-        print(f"{self.timestamp()} Connected to SABnzbd: {config.sabnzbd.url}")
+        self._print(_rule("=", 80))
+        self._print("SABnzbd Media Tracker v1.0 - STARTED")
+        self._print(_rule("=", 80))
+        self._print()
+        ts = self.timestamp()
+        self._print(f"{ts} Connected to SABnzbd: {config.sabnzbd.url}")
 
         for radarr in config.radarr:
-            print(f"{self.timestamp()} Connected to Radarr: {radarr.name}")
+            self._print(f"{ts} Connected to Radarr: {radarr.name}")
 
         for sonarr in config.sonarr:
-            print(f"{self.timestamp()} Connected to Sonarr: {sonarr.name}")
+            self._print(f"{ts} Connected to Sonarr: {sonarr.name}")
 
-        print()
-        print(f"{self.timestamp()} Sync Interval: 5s | Poster Fetch: 10s | Cleanup: {config.cleanup.completed_after_hours}h retention")
-        print()
+        self._print()
+        self._print(f"{ts} Sync Interval: 5s | Poster Fetch: 10s | Cleanup: {config.cleanup.completed_after_hours}h retention")
+        self._print()
 
+    @_batched
     def initial_sync(self, downloading: int, queued: int, completed: int, active_download: Optional[Dict] = None) -> None:
         """Log initial sync results."""
         total = downloading + queued + completed
@@ -69,37 +157,31 @@ class Logger:
         if active_download:
             name = active_download.get('media_title') or active_download.get('name', 'Unknown')
             progress = active_download.get('progress', 0)
-            print(f"{self.timestamp()} Initial sync complete - Downloading: {downloading} ({name} - {progress:.1f}%), Queued: {queued}, Completed: {completed}, Total: {total}")
+            self._print(f"{self.timestamp()} Initial sync complete - Downloading: {downloading} ({name} - {progress:.1f}%), Queued: {queued}, Completed: {completed}, Total: {total}")
         else:
-            print(f"{self.timestamp()} Initial sync complete - Downloading: {downloading}, Queued: {queued}, Completed: {completed}, Total: {total}")
-        print()
+            self._print(f"{self.timestamp()} Initial sync complete - Downloading: {downloading}, Queued: {queued}, Completed: {completed}, Total: {total}")
+        self._print()
 
         # Store state
-        self.last_sync_state = {
-            'downloading': downloading,
-            'queued': queued,
-            'completed': completed,
-            'total': total
-        }
+        self.last_sync_state = (downloading, queued, completed)
 
     def sync_change(self, downloading: int, queued: int, completed: int, change_desc: Optional[str] = None) -> None:
         """Log only when sync state changes."""
-        current_state = {
-            'downloading': downloading,
-            'queued': queued,
-            'completed': completed,
-            'total': downloading + queued + completed
-        }
-
-        # Only log if something changed
-        if self.last_sync_state and current_state != self.last_sync_state:
-            if change_desc:
-                print(f"{self.timestamp()} Queue update - {change_desc} - Downloading: {downloading}, Queued: {queued}, Completed: {completed}")
-            else:
-                print(f"{self.timestamp()} Queue update - Downloading: {downloading}, Queued: {queued}, Completed: {completed}")
+        # Called every sync tick - the idle case is a single tuple compare. Not @_batched:
+        # it writes at most one line, so there is nothing to buffer.
+        current_state = (downloading, queued, completed)
+        if current_state == self.last_sync_state or self.last_sync_state is None:
+            return
 
-            self.last_sync_state = current_state
+        counts = _FMT_QUEUE_COUNTS % current_state
+        if change_desc:
+            self._print(f"{self.timestamp()} Queue update - {change_desc} - {counts}")
+        else:
+            self._print(f"{self.timestamp()} Queue update - {counts}")
+
+        self.last_sync_state = current_state
 
+    @_batched
     def download_progress(self, download: Dict) -> None:
         """Log download progress changes (only significant changes)."""
         download_id = download.get('id')
@@ -111,98 +193,112 @@ class Logger:
         # Only log if progress changed by 5% or more
         last_progress = self.last_download_progress.get(download_id, 0)
         if abs(current_progress - last_progress) >= 5:
-            print(f"{self.timestamp()} 📊 Download Progress")
-            print(f"           └─ {name[:50]}: {last_progress:.0f}% → {current_progress:.0f}% (+{current_progress - last_progress:.0f}%) @ {speed:.1f} MB/s")
+            self._print(f"{self.timestamp()} 📊 Download Progress")
+            self._print(f"           └─ {name[:50]}: {last_progress:.0f}% → {current_progress:.0f}% (+{current_progress - last_progress:.0f}%) @ {speed:.1f} MB/s")
             if time_left and time_left != 'Unknown':
-                print(f"              ⏱️  {time_left} remaining")
-            print()
+                self._print(f"              ⏱️  {time_left} remaining")
+            self._print()
 
             self.last_download_progress[download_id] = current_progress
+            self.last_download_progress.move_to_end(download_id)
+            # Failed/removed downloads never reach download_complete - drop the stalest entries
+            while len(self.last_download_progress) > PROGRESS_TRACK_LIMIT:
+                self.last_download_progress.popitem(last=False)
 
+    @_batched
     def download_complete(self, download: Dict) -> None:
         """Log download completion with celebration."""
         name = download.get('media_title') or download.get('name', 'Unknown')
         size = download.get('size_total', 0)
 
-        print(f"{self.timestamp()} ✅ DOWNLOAD COMPLETE!")
+        self._print(f"{self.timestamp()} ✅ DOWNLOAD COMPLETE!")
         self.draw_box(f"  {name[:50]}")
 
         if size > 1024:
-            print(f"           └─ Size: {size / 1024:.1f} GB")
+            self._print(f"           └─ Size: {size / 1024:.1f} GB")
         else:
-            print(f"           └─ Size: {size:.1f} MB")
+            self._print(f"           └─ Size: {size:.1f} MB")
 
-        print(f"              Moving to: Completed section")
-        print()
+        self._print(f"              Moving to: Completed section")
+        self._print()
 
         # Clear from progress tracking
         download_id = download.get('id')
         if download_id in self.last_download_progress:
             del self.last_download_progress[download_id]
 
+    @_batched
     def poster_fetch_start(self, fetch_type: str, downloading_remaining: int, completed_remaining: int, queued_remaining: int) -> None:
         """Log start of poster fetch batch."""
         total = downloading_remaining + completed_remaining + queued_remaining
 
         if self.poster_fetch_start_time is None:
-            self.poster_fetch_start_time = datetime.now()
+            self.poster_fetch_start_time = time.monotonic()
             self.total_posters_needed = total
 
         if fetch_type == "downloading":
-            print(f"{self.timestamp()} 🖼️  Poster Fetch: Downloading (Priority 1)")
+            self._print(f"{self.timestamp()} 🖼️  Poster Fetch: Downloading (Priority 1)")
             if completed_remaining > 0 or queued_remaining > 0:
-                print(f"           └─ {completed_remaining} completed + {queued_remaining} queued remaining")
+                self._print(f"           └─ {completed_remaining} completed + {queued_remaining} queued remaining")
         elif fetch_type == "completed":
-            print(f"{self.timestamp()} 🖼️  Poster Fetch: Completed Items (Priority 2)")
+            self._print(f"{self.timestamp()} 🖼️  Poster Fetch: Completed Items (Priority 2)")
             if queued_remaining > 0:
-                print(f"           └─ {completed_remaining} completed + {queued_remaining} queued remaining")
+                self._print(f"           └─ {completed_remaining} completed + {queued_remaining} queued remaining")
         elif fetch_type == "queued":
-            print(f"{self.timestamp()} 🖼️  Poster Fetch: Queue (Priority 3)")
-            print(f"           └─ Fetching by position (#2, #3, #4...)")
+            self._print(f"{self.timestamp()} 🖼️  Poster Fetch: Queue (Priority 3)")
+            self._print(f"           └─ Fetching by position (#2, #3, #4...)")
 
+    @_batched
     def poster_fetch_results(self, found: List[str], not_found: List[str], total_found: int, total_needed: int) -> None:
         """Log poster fetch results with progress."""
-        # Show found items (limit to 5)
-        for i, item in enumerate(found[:5]):
-            prefix = "├─" if i < len(found[:5]) - 1 or len(not_found) > 0 else "└─"
-            print(f"           {prefix} ✓ {item}")
-
-        if len(found) > 5:
-            print(f"           ├─ ... and {len(found) - 5} more")
-
-        # Show not found items (limit to 3)
-        for i, item in enumerate(not_found[:3]):
-            prefix = "└─" if i == len(not_found[:3]) - 1 else "├─"
-            print(f"           {prefix} ✗ Not found: {item}")
+        if self.verbose:
+            # Show found items (limit to 5)
+            shown_found = found[:5]
+            last_found = len(shown_found) - 1
+            has_not_found = bool(not_found)
+            for i, item in enumerate(shown_found):
+                prefix = "├─" if i < last_found or has_not_found else "└─"
+                self._print(f"           {prefix} ✓ {item}")
+
+            if len(found) > 5:
+                self._print(f"           ├─ ... and {len(found) - 5} more")
+
+            # Show not found items (limit to 3)
+            shown_not_found = not_found[:3]
+            last_not_found = len(shown_not_found) - 1
+            for i, item in enumerate(shown_not_found):
+                prefix = "└─" if i == last_not_found else "├─"
+                self._print(f"           {prefix} ✗ Not found: {item}")
 
         # Batch summary
         batch_size = len(found) + len(not_found)
         success_rate = (len(found) / batch_size * 100) if batch_size > 0 else 0
-        print(f"           └─ Batch: {len(found)}/{batch_size} found ({success_rate:.0f}% success)")
-        print()
+        self._print(f"           └─ Batch: {len(found)}/{batch_size} found ({success_rate:.0f}% success)")
+        self._print()
 
         # Progress bar
         percent = (total_found / total_needed * 100) if total_needed > 0 else 0
         bar = self.progress_bar(total_found, total_needed, width=30)
-        print(f"           Progress: {bar} {total_found}/{total_needed} ({percent:.1f}%)")
+        self._print(f"           Progress: {bar} {total_found}/{total_needed} ({percent:.1f}%)")
 
         # Calculate ETA
-        if self.poster_fetch_start_time and total_found > 0:
-            elapsed = (datetime.now() - self.poster_fetch_start_time).total_seconds()
+        if self.poster_fetch_start_time is not None and total_found > 0:
+            elapsed = time.monotonic() - self.poster_fetch_start_time
             rate = total_found / elapsed * 60  # posters per minute
             remaining = total_needed - total_found
             eta_minutes = remaining / rate if rate > 0 else 0
 
             if eta_minutes > 60:
-                print(f"           ETA: ~{eta_minutes / 60:.0f}h {eta_minutes % 60:.0f}m @ {rate:.0f} posters/min")
+                self._print(f"           ETA: ~{eta_minutes / 60:.0f}h {eta_minutes % 60:.0f}m @ {rate:.0f} posters/min")
             else:
-                print(f"           ETA: ~{eta_minutes:.0f}m @ {rate:.0f} posters/min")
+                self._print(f"           ETA: ~{eta_minutes:.0f}m @ {rate:.0f} posters/min")
 
-        print()
+        self._print()
 
         # Check for milestones
         self.check_milestone(total_found, total_needed)
 
+    @_batched
     def check_milestone(self, current: int, total: int) -> None:
         """Check and log milestone achievements."""
         if total == 0:
@@ -218,37 +314,38 @@ class Logger:
                 if milestone == 100:
                     self.poster_complete(current, total)
                 else:
-                    elapsed = (datetime.now() - self.poster_fetch_start_time).total_seconds() / 60
+                    elapsed = (time.monotonic() - self.poster_fetch_start_time) / 60
                     rate = current / elapsed if elapsed > 0 else 0
                     remaining = total - current
                     eta = remaining / rate if rate > 0 else 0
 
-                    print(f"{self.timestamp()} 🎯 MILESTONE: {milestone}% Complete")
-                    print(f"           ├─ Posters fetched: {current}/{total}")
+                    self._print(f"{self.timestamp()} 🎯 MILESTONE: {milestone}% Complete")
+                    self._print(f"           ├─ Posters fetched: {current}/{total}")
                     if milestone < 100:
-                        print(f"           ├─ Time elapsed: {elapsed:.0f}m | ETA: {eta:.0f}m")
-                        print(f"           └─ Speed: {rate:.0f} posters/min")
-                    print()
+                        self._print(f"           ├─ Time elapsed: {elapsed:.0f}m | ETA: {eta:.0f}m")
+                        self._print(f"           └─ Speed: {rate:.0f} posters/min")
+                    self._print()
 
+    @_batched
     def poster_complete(self, total_found: int, total_needed: int) -> None:
         """Log poster fetching completion."""
-        elapsed = (datetime.now() - self.poster_fetch_start_time).total_seconds() / 60
+        elapsed = (time.monotonic() - self.poster_fetch_start_time) / 60
         rate = total_found / elapsed if elapsed > 0 else 0
         success_rate = (total_found / total_needed * 100) if total_needed > 0 else 0
 
-        print(f"{self.timestamp()} 🎉 ALL POSTERS COMPLETE!")
+        self._print(f"{self.timestamp()} 🎉 ALL POSTERS COMPLETE!")
         self.draw_box("  ✨ Poster fetching finished!")
-        print(f"           ├─ Total: {total_needed} items processed")
-        print(f"           ├─ Found: {total_found} posters ({success_rate:.0f}% success)")
+        self._print(f"           ├─ Total: {total_needed} items processed")
+        self._print(f"           ├─ Found: {total_found} posters ({success_rate:.0f}% success)")
 
         if total_needed - total_found > 0:
-            print(f"           ├─ Failed: {total_needed - total_found} items (not in Radarr/Sonarr)")
+            self._print(f"           ├─ Failed: {total_needed - total_found} items (not in Radarr/Sonarr)")
 
-        print(f"           ├─ Duration: {elapsed:.0f}m")
-        print(f"           └─ Average: {rate:.0f} posters/minute")
-        print()
-        print("           All posters loaded! Now monitoring for new downloads...")
-        print()
+        self._print(f"           ├─ Duration: {elapsed:.0f}m")
+        self._print(f"           └─ Average: {rate:.0f} posters/minute")
+        self._print()
+        self._print("           All posters loaded! Now monitoring for new downloads...")
+        self._print()
 
         # Reset for next batch
         self.poster_fetch_start_time = None
@@ -256,59 +353,54 @@ class Logger:
 
     def error(self, message: str, context: Optional[str] = None) -> None:
         """Log an error with optional context."""
-        error_entry = {
-            'time': datetime.now(),
-            'message': message,
-            'context': context
-        }
-        self.errors_buffer.append(error_entry)
+        entry = self.error_counts.setdefault(message, {'count': 0, 'contexts': {}})
+        entry['count'] += 1
+        if context and len(entry['contexts']) < 3:
+            entry['contexts'][context] = None  # Insertion-ordered set of the first few contexts
+        self.error_total += 1
 
         # If we have 5+ errors, show summary
-        if len(self.errors_buffer) >= 5:
+        if self.error_total >= 5:
             self.error_summary()
 
+    @_batched
     def error_summary(self) -> None:
         """Show aggregated error summary."""
-        if not self.errors_buffer:
+        if not self.error_counts:
             return
 
-        # Group errors by message
-        error_groups = {}
-        for error in self.errors_buffer:
-            msg = error['message']
-            if msg not in error_groups:
-                error_groups[msg] = []
-            error_groups[msg].append(error)
-
-        print(f"{self.timestamp()} ⚠️  ERRORS DETECTED (Last minute)")
-        for msg, errors in error_groups.items():
-            count = len(errors)
-            contexts = [e.get('context') for e in errors if e.get('context')]
-            if count > 1:
-                print(f"           ├─ 🔴 {msg} ({count}x)")
+        self._print(f"{self.timestamp()} ⚠️  ERRORS DETECTED (Last minute)")
+        for msg, entry in self.error_counts.items():
+            if entry['count'] > 1:
+                self._print(f"           ├─ 🔴 {msg} ({entry['count']}x)")
             else:
-                print(f"           ├─ 🔴 {msg}")
+                self._print(f"           ├─ 🔴 {msg}")
 
-            if contexts:
-                print(f"              └─ Affected: {', '.join(set(contexts[:3]))}")
+            if entry['contexts']:
+                self._print(f"              └─ Affected: {', '.join(entry['contexts'])}")
 
-        print(f"           └─ 💡 Suggestion: Check your Radarr/Sonarr instances")
-        print()
+        self._print(f"           └─ 💡 Suggestion: Check your Radarr/Sonarr instances")
+        self._print()
 
-        # Clear buffer
-        self.errors_buffer.clear()
+        # Clear counts
+        self.error_counts.clear()
+        self.error_total = 0
         self.last_error_report = datetime.now()
 
+    @_batched
     def cleanup_start(self, total_items: int) -> None:
         """Log cleanup job start."""
-        print(f"{self.timestamp()} Cleanup: Checking {total_items} completed items")
+        self._print(f"{self.timestamp()} Cleanup: Checking {total_items} completed items")
 
+    @_batched
     def cleanup_complete(self, removed_items: List[str], kept_count: int) -> None:
         """Log cleanup results."""
-        print(f"{self.timestamp()} Cleanup complete: {len(removed_items)} removed, {kept_count} kept (within retention period)")
-        for item in removed_items:
-            print(f"{self.timestamp()}   Removed: {item}")
-        print()
+        ts = self.timestamp()  # One timestamp for the whole report
+        self._print(f"{ts} Cleanup complete: {len(removed_items)} removed, {kept_count} kept (within retention period)")
+        if self.verbose:
+            for item in removed_items:
+                self._print(f"{ts}   Removed: {item}")
+        self._print()
 
 
 # Global logger instance
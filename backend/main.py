@@ -1,58 +1,31 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from contextlib import asynccontextmanager
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from typing import List
-from pydantic import BaseModel
+from typing import Optional
+import asyncio
 import uvicorn
 
 from backend.database import db, Download
+from backend.schemas import PriorityUpdate, PriorityBulkUpdate
 from backend.sync_service import SyncService
 from backend.config import get_config
 from backend.logger import logger
 
 
-# Pydantic models for API
-class DownloadResponse(BaseModel):
-    id: str
-    name: str
-    status: str
-    detailed_status: str | None  # Actual SABnzbd status (Downloading, Extracting, etc.)
-    progress: float
-    size_total: float | None
-    size_left: float | None
-    time_left: str | None
-    speed: float | None
-    category: str | None
-    priority: str | None
-    queue_position: int | None  # Position in queue (#1, #2, #3...)
-    media_type: str | None
-    media_title: str | None
-    poster_url: str | None
-    year: int | None
-    arr_instance: str | None
-    season: int | None  # TV show season number
-    episode: int | None  # TV show episode number
-    added_at: str
-    completed_at: str | None
-    failed: bool
-    failure_reason: str | None
-
-    class Config:
-        from_attributes = True
-
-
-class PriorityUpdate(BaseModel):
-    priority: str  # force, high, normal, low, paused
-
-
-# Global scheduler
-scheduler = AsyncIOScheduler()
 sync_service = SyncService()
 
 
+async def run_periodically(job, interval_seconds: float):
+    """Run a job every interval_seconds until cancelled (a run never overlaps the previous one)."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await job()
+        except Exception as e:
+            logger.write(f"{logger.timestamp()} ❌ Error in {job.__name__}: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
@@ -60,86 +33,84 @@ async def lifespan(app: FastAPI):
     try:
         config = get_config()
     except FileNotFoundError as e:
-        print(f"❌ ERROR: {e}")
-        print("Please create config.yml from config.example.yml and configure it.")
+        logger.write(f"❌ ERROR: {e}")
+        logger.write("Please create config.yml from config.example.yml and configure it.")
         raise
     except Exception as e:
-        print(f"❌ ERROR loading config: {e}")
+        logger.write(f"❌ ERROR loading config: {e}")
         raise
 
     # Initialize database
     try:
         await db.init_db()
     except Exception as e:
-        print(f"❌ ERROR initializing database: {e}")
+        logger.write(f"❌ ERROR initializing database: {e}")
         raise
 
+    logger.verbose = config.debug.verbose_logging
+
     # Show startup banner
     logger.startup_banner(config)
 
+    # Open HTTP sessions to Radarr/Sonarr
+    await sync_service.start()
+
+    # Seed stats and download lists from existing data in case SABnzbd is unreachable at startup
+    await sync_service.refresh_views()
+
     # Initial sync (fast - skip media info to avoid blocking startup)
     try:
         await sync_service.sync_downloads(fetch_media_info=False, is_initial=True)
     except Exception as e:
-        print(f"{logger.timestamp()} ⚠️  Initial sync failed: {e}")
-        print("           └─ Will retry automatically every 5 seconds...")
-        print()
+        logger.write(f"{logger.timestamp()} ⚠️  Initial sync failed: {e}")
+        logger.write("           └─ Will retry automatically every 5 seconds...")
+        logger.write()
+
+    # Define async wrapper functions for background jobs
+    sync_ticks = 0
+    poster_task = None
 
-    # Define async wrapper functions for scheduler
     async def sync_job():
-        """Fast sync job - updates download status without fetching posters."""
+        """Fast sync job every 5s - every other tick it also starts a batch of missing posters
+        in the background, so slow Radarr/Sonarr searches never hold up the next sync."""
+        nonlocal sync_ticks, poster_task
+        sync_ticks += 1
         await sync_service.sync_downloads(fetch_media_info=False)
-
-    async def poster_job():
-        """Poster fetch job - gradually fetches missing posters."""
-        await sync_service.fetch_missing_media_info()
+        # Skip the tick while the previous batch is still searching
+        if sync_ticks % 2 == 0 and (poster_task is None or poster_task.done()):
+            poster_task = asyncio.create_task(sync_service.fetch_missing_media_info())
 
     async def cleanup_job():
         """Cleanup job - removes old completed downloads."""
         await sync_service.cleanup_completed()
 
-    # Schedule periodic syncs (fast - no media info)
-    scheduler.add_job(
-        sync_job,
-        'interval',
-        seconds=5,
-        id='sync_downloads',
-        max_instances=1
-    )
-
-    # Schedule media info fetch (slower, batched)
-    scheduler.add_job(
-        poster_job,
-        'interval',
-        seconds=10,
-        id='fetch_media_info',
-        max_instances=1
-    )
-
-    # Schedule cleanup
-    scheduler.add_job(
-        cleanup_job,
-        'interval',
-        minutes=config.cleanup.check_interval_minutes,
-        id='cleanup_completed',
-        max_instances=1
-    )
-    scheduler.start()
+    # Background jobs: library warm-up, fast sync + batched media info fetch, cleanup
+    tasks = [
+        asyncio.create_task(sync_service.arr_manager.warm()),
+        asyncio.create_task(run_periodically(sync_job, 5)),
+        asyncio.create_task(run_periodically(cleanup_job, config.cleanup.check_interval_minutes * 60)),
+    ]
 
     logger.separator()
-    print(f"  Backend ready at http://{config.server.host}:{config.server.port}")
-    print(f"  Frontend will start shortly...")
+    logger.write(f"  Backend ready at http://{config.server.host}:{config.server.port}")
+    logger.write(f"  Frontend will start shortly...")
     logger.separator()
-    print()
+    logger.write()
 
     yield
 
     # Shutdown
-    print(f"\n{logger.timestamp()} 🛑 Shutting down gracefully...")
-    scheduler.shutdown()
+    logger.write(f"\n{logger.timestamp()} 🛑 Shutting down gracefully...")
+    if poster_task is not None:
+        tasks.append(poster_task)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await sync_service.close()
+    logger.close()
 
 
-app = FastAPI(title="SABnzbd Media Tracker", lifespan=lifespan)
+app = FastAPI(title="SABnzbd Media Tracker", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -151,78 +122,73 @@ app.add_middleware(
 )
 
 
-async def get_db_session():
-    """Dependency to get database session."""
-    async for session in db.get_session():
-        yield session
-
-
 @app.get("/")
 async def root():
     """Health check endpoint."""
     return {"status": "ok", "message": "SABnzbd Media Tracker API"}
 
 
-@app.get("/api/downloads", response_model=List[DownloadResponse])
-async def get_all_downloads(session: AsyncSession = Depends(get_db_session)):
+# ETag for a status with no downloads
+EMPTY_LIST_ETAG = '"empty"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag: any entry of a comma-separated list,
+    compared weakly (W/ prefixes ignored), or *."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+def snapshot_response(key: str, request: Request) -> Response:
+    """Serve a download list from the pre-encoded snapshot SyncService rebuilds after every write.
+    Polls whose If-None-Match matches the current list get an empty 304."""
+    etag = sync_service.latest_snapshot_etags.get(key, EMPTY_LIST_ETAG)
+    # no-cache: browsers may keep the body but must revalidate it on every poll
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=sync_service.latest_snapshot_json.get(key, b"[]"),
+        media_type="application/json",
+        headers=headers
+    )
+
+
+@app.get("/api/downloads", response_class=Response)
+async def get_all_downloads(request: Request):
     """Get all downloads."""
-    downloads = await sync_service.get_all_downloads(session)
-    return [
-        DownloadResponse(
-            id=d.id,
-            name=d.name,
-            status=d.status,
-            detailed_status=d.detailed_status,
-            progress=d.progress or 0.0,
-            size_total=d.size_total,
-            size_left=d.size_left,
-            time_left=d.time_left,
-            speed=d.speed,
-            category=d.category,
-            priority=d.priority,
-            queue_position=d.queue_position,
-            media_type=d.media_type,
-            media_title=d.media_title,
-            poster_url=d.poster_url,
-            year=d.year,
-            arr_instance=d.arr_instance,
-            season=d.season,
-            episode=d.episode,
-            added_at=d.added_at.isoformat() + 'Z' if d.added_at else None,
-            completed_at=d.completed_at.isoformat() + 'Z' if d.completed_at else None,
-            failed=d.failed or False,
-            failure_reason=d.failure_reason
-        )
-        for d in downloads
-    ]
+    return snapshot_response("all", request)
 
 
-@app.get("/api/downloads/downloading", response_model=List[DownloadResponse])
-async def get_downloading(session: AsyncSession = Depends(get_db_session)):
+@app.get("/api/downloads/downloading", response_class=Response)
+async def get_downloading(request: Request):
     """Get currently downloading items (including processing/unpacking)."""
-    downloads = await sync_service.get_downloads_by_status(session, "downloading")
-    return [DownloadResponse.from_orm(d) for d in downloads]
+    return snapshot_response("downloading", request)
 
 
-@app.get("/api/downloads/queued", response_model=List[DownloadResponse])
-async def get_queued(session: AsyncSession = Depends(get_db_session)):
+@app.get("/api/downloads/queued", response_class=Response)
+async def get_queued(request: Request):
     """Get queued items."""
-    downloads = await sync_service.get_downloads_by_status(session, "queued")
-    return [DownloadResponse.from_orm(d) for d in downloads]
+    return snapshot_response("queued", request)
 
 
-@app.get("/api/downloads/completed", response_model=List[DownloadResponse])
-async def get_completed(session: AsyncSession = Depends(get_db_session)):
+@app.get("/api/downloads/completed", response_class=Response)
+async def get_completed(request: Request):
     """Get completed items."""
-    downloads = await sync_service.get_downloads_by_status(session, "completed")
-    return [DownloadResponse.from_orm(d) for d in downloads]
+    return snapshot_response("completed", request)
 
 
-@app.get("/api/downloads/failed", response_model=List[DownloadResponse])
-async def get_failed(session: AsyncSession = Depends(get_db_session)):
+@app.get("/api/downloads/failed", response_class=Response)
+async def get_failed(request: Request):
     """Get failed downloads."""
-    downloads = await sync_service.get_downloads_by_status(session, "failed")
-    return [DownloadResponse.from_orm(d) for d in downloads]
+    return snapshot_response("failed", request)
 
 
 @app.post("/api/downloads/{download_id}/priority")
@@ -236,22 +202,40 @@ async def update_download_priority(download_id: str, priority_update: PriorityUp
     return {"status": "ok", "message": "Priority updated"}
 
 
+@app.post("/api/admin/priority-bulk")
+async def update_priority_bulk(priority_update: PriorityBulkUpdate):
+    """Update priority for several downloads at once."""
+    if not priority_update.ids:
+        raise HTTPException(status_code=400, detail="No download IDs given")
+
+    success = await sync_service.update_priority_bulk(priority_update.ids, priority_update.priority)
+
+    if not success:
+        raise HTTPException(status_code=500, detail="Failed to update priority")
+
+    return {"status": "ok", "message": f"Priority updated for {len(priority_update.ids)} downloads"}
+
+
 @app.post("/api/admin/reset-poster-flags")
-async def reset_poster_flags(session: AsyncSession = Depends(get_db_session)):
+async def reset_poster_flags():
     """Reset poster_attempted flag for items without posters so they can be retried."""
     try:
         from sqlalchemy import update
 
-        # Update all downloads that have no poster but were attempted
-        result = await session.execute(
-            update(Download)
-            .where(Download.poster_url == None)
-            .where(Download.poster_attempted == True)
-            .values(poster_attempted=False)
-        )
-
-        await session.commit()
-        count = result.rowcount
+        # Goes through the single writer like the background jobs
+        async with db.writer_session() as session:
+            # Update all downloads that have no poster but were attempted
+            result = await session.execute(
+                update(Download)
+                .where(Download.poster_url == None)
+                .where(Download.poster_attempted == True)
+                .values(poster_attempted=False)
+                .returning(Download.id)
+            )
+            count = len(result.scalars().all())
+
+            await session.commit()
+            await sync_service.refresh_snapshot(session)
 
         return {
             "status": "ok",
@@ -262,25 +246,9 @@ async def reset_poster_flags(session: AsyncSession = Depends(get_db_session)):
 
 
 @app.get("/api/stats")
-async def get_stats(session: AsyncSession = Depends(get_db_session)):
-    """Get statistics about downloads."""
-    all_downloads = await sync_service.get_all_downloads(session)
-
-    downloading = len([d for d in all_downloads if d.status == "downloading"])
-    queued = len([d for d in all_downloads if d.status == "queued"])
-    completed = len([d for d in all_downloads if d.status == "completed"])
-    failed = len([d for d in all_downloads if d.failed])
-
-    # Calculate total speed
-    total_speed = sum(d.speed or 0 for d in all_downloads if d.status == "downloading")
-
-    return {
-        "downloading": downloading,
-        "queued": queued,
-        "completed": completed,
-        "failed": failed,
-        "total_speed": round(total_speed, 2)
-    }
+async def get_stats():
+    """Get statistics about downloads (maintained by the sync job, no DB query)."""
+    return sync_service.stats
 
 
 if __name__ == "__main__":
@@ -1,7 +1,46 @@
+import asyncio
+import functools
 import aiohttp
-from typing import List, Dict, Any, Optional
+import orjson
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlencode
+from yarl import URL
 from datetime import datetime
 import PTN
+from backend.database import BYTES_PER_MB, KIB_PER_MB
+from backend.logger import logger
+
+
+# Characters that can trail the number in a speed string ('12.3M', '500 KB/s')
+_SPEED_UNIT_CHARS = "KMGBkmgb/Ss"
+# Multiplier to convert each speed unit to MB/s
+_SPEED_MULT = {
+    'KB/S': 1 / 1024,
+    'K': 1 / 1024,
+    'MB/S': 1.0,
+    'M': 1.0,
+    'GB/S': 1024.0,
+    'G': 1024.0,
+    'B/S': 1 / (1024 * 1024),
+}
+
+# SABnzbd slot statuses that mean the item itself is paused
+_PAUSED_STATUSES = frozenset({"Paused"})
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_title(name: str) -> Tuple[Optional[int], Optional[int]]:
+    """Extract (season, episode) from a release name with PTN, memoized since the
+    same queue/history names are re-parsed every sync."""
+    parsed = PTN.parse(name)
+    episode = parsed.get("episode")
+
+    # Handle multi-episode files (e.g., S01E39E40 returns [39, 40])
+    # Store only the first episode number for database compatibility
+    if isinstance(episode, list):
+        episode = episode[0] if episode else None
+
+    return parsed.get("season"), episode
 
 
 class SABnzbdClient:
@@ -9,31 +48,73 @@ class SABnzbdClient:
         self.url = url.rstrip('/')
         self.api_key = api_key
         self.enable_priority_logging = enable_priority_logging
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+        # Query strings are encoded once; the polled queue/history URLs are built once and reused
+        self._base_query = urlencode({"apikey": api_key, "output": "json"})
+        self._queue_url = self._api_url("queue")
+        self._history_urls: Dict[int, URL] = {}  # limit -> URL
+        self._history_cache: Dict[int, Tuple[Any, Dict[str, Any]]] = {}  # limit -> (last_history_update, response)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get the keep-alive HTTP session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            async with self._session_lock:
+                if self._session is None or self._session.closed:
+                    self._session = aiohttp.ClientSession(
+                        connector=aiohttp.TCPConnector(limit=10, keepalive_timeout=60),
+                        timeout=aiohttp.ClientTimeout(total=30)
+                    )
+        return self._session
+
+    async def close(self):
+        """Close the HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _api_url(self, mode: str, extra_params: Dict[str, Any] = None) -> URL:
+        """Build an already-encoded SABnzbd API URL."""
+        query = f"{self._base_query}&mode={mode}"
+        if extra_params:
+            query = f"{query}&{urlencode(extra_params)}"
+        return URL(f"{self.url}/api?{query}", encoded=True)
 
     async def _make_request(self, mode: str, extra_params: Dict[str, Any] = None) -> Dict[str, Any]:
         """Make a request to SABnzbd API."""
-        params = {
-            "apikey": self.api_key,
-            "output": "json",
-            "mode": mode
-        }
-
-        if extra_params:
-            params.update(extra_params)
+        return await self._get_json(self._api_url(mode, extra_params))
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{self.url}/api", params=params) as response:
-                if response.status != 200:
-                    raise Exception(f"SABnzbd API error: {response.status}")
-                return await response.json()
+    async def _get_json(self, url: URL) -> Dict[str, Any]:
+        """GET an API URL and decode the JSON response."""
+        session = await self._get_session()
+        async with session.get(url) as response:
+            if response.status != 200:
+                raise Exception(f"SABnzbd API error: {response.status}")
+            return orjson.loads(await response.read())
 
     async def get_queue(self) -> Dict[str, Any]:
         """Get the current queue with all downloads."""
-        return await self._make_request("queue")
+        return await self._get_json(self._queue_url)
 
     async def get_history(self, limit: int = 100) -> Dict[str, Any]:
-        """Get download history."""
-        return await self._make_request("history", {"limit": limit})
+        """Get download history.
+        Sends back the last_history_update SABnzbd returned last time; when nothing changed
+        SABnzbd answers {"history": false} instead of the full list and the previous response is reused."""
+        url = self._history_urls.get(limit)
+        if url is None:
+            url = self._history_urls[limit] = self._api_url("history", {"limit": limit})
+
+        cached = self._history_cache.get(limit)
+        if cached is not None:
+            url = url.update_query(last_history_update=cached[0])
+
+        data = await self._get_json(url)
+        history = data.get("history") if isinstance(data, dict) else None
+        if history is False and cached is not None:
+            return cached[1]
+        if isinstance(history, dict) and history.get("last_history_update") is not None:
+            self._history_cache[limit] = (history["last_history_update"], data)
+        return data
 
     async def set_priority(self, nzo_id: str, priority: int) -> Dict[str, Any]:
         """
@@ -82,7 +163,10 @@ class SABnzbdClient:
             return items
 
         queue = queue_data["queue"]
-        slots = queue.get("slots", [])
+        slots = queue.get("slots")
+        if not slots:
+            return items
+
         queue_paused = queue.get("paused", False)
 
         # CRITICAL: Use GLOBAL queue speed, not per-item mbpersec!
@@ -91,57 +175,46 @@ class SABnzbdClient:
         # Parse speed string like "12.3 MB/s" or "500 KB/s" to MB/s
         global_speed_mb = self._parse_speed_to_mb(global_speed_str)
 
+        # Local aliases for the per-slot numeric conversions (SABnzbd sends numbers as strings)
+        _flt, _int = float, int
+
         for position, slot in enumerate(slots, start=1):
             # Determine status
             status = slot.get("status", "")
 
             # CRITICAL: SABnzbd can only download ONE item at a time
-            # Position #1 is the active download, everything else is queued
-            if status in ["Paused"] or queue_paused:
+            # Position #1 is ALWAYS the active item (downloading, extracting, verifying, etc.),
+            # everything else is queued (positions 2, 3, 4...)
+            if queue_paused or status in _PAUSED_STATUSES:
                 item_status = "paused"
-            elif position == 1:
-                # Position #1 is ALWAYS the active item (downloading, extracting, verifying, etc.)
-                # Include all post-processing statuses: Extracting, Verifying, Repairing, Moving, QuickCheck
-                item_status = "downloading"
             else:
-                # Everything else is queued (positions 2, 3, 4...)
-                item_status = "queued"
+                item_status = "downloading" if position == 1 else "queued"
 
             # Use global speed for actively downloading items only
-            percentage = float(slot.get("percentage", 0))
-            if item_status == "downloading" and percentage > 0:
-                item_speed = global_speed_mb
-            else:
-                item_speed = 0.0
+            percentage = _flt(slot.get("percentage") or 0)
+            item_speed = global_speed_mb if item_status == "downloading" and percentage > 0 else 0.0
 
             priority_value = slot.get("priority")
 
             # Debug logging (controlled by config.yml -> debug.enable_priority_logging)
             if self.enable_priority_logging and position <= 3:
-                print(f"[RAW Priority Debug] Pos {position}: RAW value = {repr(priority_value)} (type: {type(priority_value).__name__})")
-                print(f"[RAW Priority Debug] Pos {position}: Full slot data = {slot}")
+                logger.write(f"[RAW Priority Debug] Pos {position}: RAW value = {repr(priority_value)} (type: {type(priority_value).__name__})")
+                logger.write(f"[RAW Priority Debug] Pos {position}: Full slot data = {slot}")
 
             # Parse filename to extract season/episode for TV shows
-            filename = slot.get("filename", "")
-            parsed = PTN.parse(filename)
-            season = parsed.get("season")
-            episode = parsed.get("episode")
-
-            # Handle multi-episode files (e.g., S01E39E40 returns [39, 40])
-            # Store only the first episode number for database compatibility
-            if isinstance(episode, list) and len(episode) > 0:
-                episode = episode[0]
+            filename = slot.get("filename")
+            season, episode = _parse_title(filename or "")
 
             items.append({
                 "id": slot.get("nzo_id"),
-                "name": slot.get("filename"),
+                "name": filename,
                 "status": item_status,
                 "detailed_status": status,  # Actual SABnzbd status (Downloading, Extracting, etc.)
-                "progress": float(slot.get("percentage", 0)),
-                "size_total": float(slot.get("mb", 0)),
-                "size_left": float(slot.get("mbleft", 0)),
+                "progress": percentage,
+                "size_total": _int(_flt(slot.get("mb") or 0) * BYTES_PER_MB),  # Stored as bytes
+                "size_left": _int(_flt(slot.get("mbleft") or 0) * BYTES_PER_MB),
                 "time_left": slot.get("timeleft", "0:00:00"),
-                "speed": item_speed,
+                "speed": _int(item_speed * KIB_PER_MB),  # Stored as KiB/s
                 "category": slot.get("cat"),
                 "priority": priority_value,
                 "queue_position": position,  # Track position in queue
@@ -156,26 +229,12 @@ class SABnzbdClient:
         Examples: '12.3 MB/s' -> 12.3, '500 KB/s' -> 0.5, '1.2 GB/s' -> 1200.0
         """
         try:
-            import re
-            match = re.search(r'([\d.]+)\s*(KB/s|MB/s|GB/s|B/s|K|M|G)', speed_str, re.IGNORECASE)
-            if not match:
-                return 0.0
-
-            value = float(match.group(1))
-            unit = match.group(2).upper()
-
-            # Handle different unit formats
-            if unit in ['KB/S', 'K']:
-                return value / 1024  # Convert KB/s to MB/s
-            elif unit in ['MB/S', 'M']:
-                return value
-            elif unit in ['GB/S', 'G']:
-                return value * 1024  # Convert GB/s to MB/s
-            elif unit == 'B/S':
-                return value / (1024 * 1024)  # Convert B/s to MB/s
-
-            return 0.0
-        except Exception:
+            value, _, unit = speed_str.strip().partition(" ")
+            if not unit:  # Compact form, e.g. '12.3M'
+                number = value.rstrip(_SPEED_UNIT_CHARS)
+                value, unit = number, value[len(number):]
+            return float(value) * _SPEED_MULT.get(unit.strip().upper(), 0.0)
+        except (AttributeError, ValueError):
             return 0.0
 
     def parse_history_items(self, history_data: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -186,12 +245,17 @@ class SABnzbdClient:
             return items
 
         history = history_data["history"]
-        slots = history.get("slots", [])
+        slots = history.get("slots")
+        if not slots:
+            return items
+
+        _int = int
 
         for slot in slots:
             # Determine status
             status_raw = slot.get("status", "")
-            failed = slot.get("fail_message", "") != "" or status_raw == "Failed"
+            fail_message = slot.get("fail_message", "")
+            failed = fail_message != "" or status_raw == "Failed"
 
             if failed:
                 item_status = "failed"
@@ -200,24 +264,23 @@ class SABnzbdClient:
 
             # Parse completion time
             completed_at = None
-            if slot.get("completed"):
+            completed = slot.get("completed")
+            if completed:
                 try:
-                    completed_at = datetime.fromtimestamp(int(slot.get("completed")))
+                    completed_at = datetime.fromtimestamp(_int(completed))
                 except:
                     completed_at = None
 
             # Parse filename to extract season/episode for TV shows
-            filename = slot.get("name", "")
-            parsed = PTN.parse(filename)
-            season = parsed.get("season")
-            episode = parsed.get("episode")
+            name = slot.get("name")
+            season, episode = _parse_title(name or "")
 
             items.append({
                 "id": slot.get("nzo_id"),
-                "name": slot.get("name"),
+                "name": name,
                 "status": item_status,
                 "progress": 100.0 if not failed else 0.0,
-                "size_total": float(slot.get("bytes", 0)) / (1024 * 1024),  # Convert to MB
+                "size_total": _int(slot.get("bytes", 0)),  # Stored as bytes
                 "category": slot.get("category"),
                 "completed_at": completed_at,
                 "failed": failed,
@@ -0,0 +1,59 @@
+"""Pydantic models for the HTTP API."""
+from datetime import datetime, timezone
+from typing import List
+from pydantic import BaseModel, field_serializer
+
+from backend.database import BYTES_PER_MB, KIB_PER_MB
+
+
+class DownloadResponse(BaseModel):
+    id: str
+    name: str
+    status: str
+    detailed_status: str | None  # Actual SABnzbd status (Downloading, Extracting, etc.)
+    progress: float
+    size_total: int | None  # bytes, sent as MB
+    size_left: int | None  # bytes, sent as MB
+    time_left: str | None
+    speed: int | None  # KiB/s, sent as MB/s
+    category: str | None
+    priority: str | None
+    queue_position: int | None  # Position in queue (#1, #2, #3...)
+    media_type: str | None
+    media_title: str | None
+    poster_url: str | None
+    year: int | None
+    arr_instance: str | None
+    season: int | None  # TV show season number
+    episode: int | None  # TV show episode number
+    added_at: datetime | None
+    completed_at: datetime | None
+    failed: bool
+    failure_reason: str | None
+
+    class Config:
+        from_attributes = True
+
+    @field_serializer("size_total", "size_left")
+    def _serialize_mb(self, value: int | None) -> float | None:
+        """Sizes are stored as bytes - the API reports MB."""
+        return value / BYTES_PER_MB if value is not None else None
+
+    @field_serializer("speed")
+    def _serialize_mb_per_second(self, value: int | None) -> float | None:
+        """Speed is stored as KiB/s - the API reports MB/s."""
+        return value / KIB_PER_MB if value is not None else None
+
+    @field_serializer("added_at", "completed_at")
+    def _serialize_utc(self, value: datetime | None) -> int | None:
+        """Timestamps are stored as naive UTC - emit them as epoch milliseconds."""
+        return int(value.replace(tzinfo=timezone.utc).timestamp() * 1000) if value else None
+
+
+class PriorityUpdate(BaseModel):
+    priority: str  # force, high, normal, low, paused
+
+
+class PriorityBulkUpdate(BaseModel):
+    ids: List[str]  # SABnzbd NZO IDs
+    priority: str  # force, high, normal, low, paused
@@ -1,14 +1,92 @@
 import asyncio
+import hashlib
+from collections import Counter
+from itertools import chain
 import aiohttp
+import orjson
 from datetime import datetime, timedelta
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, update, func, case, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend.database import Download, db
+from pydantic import TypeAdapter
+from backend.database import Download, db, KIB_PER_MB
 from backend.sabnzbd_client import SABnzbdClient
 from backend.arr_client import ArrManager
 from backend.config import get_config
 from backend.logger import logger
-from typing import List, Dict, Any
+from backend.schemas import DownloadResponse
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+
+# Rows per INSERT ... ON CONFLICT statement during sync
+UPSERT_BATCH_SIZE = 500
+
+# Keys of parsed SABnzbd items that map onto Download columns (anything else is ignored)
+_DOWNLOAD_COLS = frozenset(c.key for c in Download.__table__.columns)
+
+# Only the columns DownloadResponse exposes - rows map 1:1 onto its fields
+_RESPONSE_COLS = tuple(getattr(Download, name) for name in DownloadResponse.model_fields)
+_RESPONSE_LIST = TypeAdapter(List[DownloadResponse])
+
+# Priority names from the API mapped to SABnzbd values
+# SABnzbd API: -1 = Low, 0 = Normal, 1 = High, 2 = Force
+_PRIORITY_MAP = {
+    "force": 2,
+    "high": 1,
+    "normal": 0,
+    "low": -1,
+}
+
+# Poster-fetch statements, built once at import (SQLAlchemy caches their compiled SQL).
+# Rows still waiting for a poster - matches the ix_downloads_poster_pending partial index.
+_POSTER_PENDING = (Download.poster_url == None, Download.poster_attempted == False)
+_POSTER_COUNTS_STMT = (
+    select(Download.status, func.count())
+    .where(*_POSTER_PENDING)
+    .group_by(Download.status)
+)
+# PRIORITY ORDER (one CASE-ordered query; a short tier is topped up from the next):
+# 1. Downloading (#1) - most important, what's downloading NOW
+# 2. Recently completed - what just finished (newest first)
+# 3. Queued (#2, #3, #4...) - fill in queue posters last
+# Plain rows - only the columns the search needs, no ORM objects to track.
+_POSTER_BATCH_STMT = (
+    select(Download.id, Download.name, Download.category, Download.status, Download.queue_position)
+    .where(*_POSTER_PENDING)
+    .where(Download.status.in_(('downloading', 'completed', 'queued')))
+    .order_by(
+        case((Download.status == 'downloading', 0), (Download.status == 'completed', 1), else_=2),
+        Download.completed_at.desc(),
+        Download.queue_position.asc(),
+    )
+    .limit(5)  # Reduced from 20 to 5 to prevent job overlaps
+)
+
+# Writes one poster search result (executemany over the matched rows of a batch)
+_POSTER_RESULT_STMT = (
+    update(Download.__table__)
+    .where(Download.__table__.c.id == bindparam("b_id"))
+    .values(
+        media_type=bindparam("media_type"),
+        media_title=bindparam("media_title"),
+        poster_url=bindparam("poster_url"),
+        year=bindparam("year"),
+        arr_instance=bindparam("arr_instance"),
+    )
+)
+
+
+def _priority_accepted(result: Any) -> bool:
+    """Whether SABnzbd accepted a priority change. Rejections come back in the body:
+    {"status": false, "error": ...}, or position -1 for an unknown NZO ID."""
+    if not isinstance(result, dict):
+        return False
+    return result.get("status") is not False and not result.get("error") and result.get("position") != -1
+
+
+def _status_breakdown(rows: Iterable) -> str:
+    """Summarize the statuses of some rows, e.g. "2 completed, 3 queued"."""
+    return ", ".join(f"{count} {status}" for status, count in Counter(row.status for row in rows).items())
 
 
 class SyncService:
@@ -36,139 +114,186 @@ class SyncService:
 
         self.cleanup_hours = config.cleanup.completed_after_hours
 
+        # Dashboard counters, refreshed after every write so /api/stats never touches the DB.
+        # Replaced as a whole (never mutated) so readers always see a consistent snapshot.
+        self.stats: Dict[str, Any] = {
+            "downloading": 0,
+            "queued": 0,
+            "completed": 0,
+            "failed": 0,
+            "total_speed": 0.0
+        }
+        # Serialized download lists keyed by "all" and by status, swapped in whole like stats
+        self.latest_snapshot: Dict[str, List[Dict[str, Any]]] = {"all": []}
+        self.latest_snapshot_json: Dict[str, bytes] = {"all": b"[]"}  # Same lists, pre-encoded as JSON
+        self.latest_snapshot_etags: Dict[str, str] = {}  # Content hash of each encoded list
+        # id -> (row values, serialized dict) from the last load, so unchanged rows aren't re-serialized
+        self._serialized: Dict[str, Tuple[tuple, Dict[str, Any]]] = {}
+
+        # Overlapping sync_downloads() calls collapse into one pending re-run
+        self._sync_running = False
+        self._sync_pending = False
+
+    async def start(self):
+        """Open HTTP sessions (call once the event loop is running)."""
+        await self.arr_manager.startup()
+
+    async def close(self):
+        """Close HTTP sessions to SABnzbd and Radarr/Sonarr."""
+        await self.sabnzbd.close()
+        await self.arr_manager.close()
+
     async def sync_downloads(self, fetch_media_info: bool = True, is_initial: bool = False):
-        """Sync downloads from SABnzbd to database."""
+        """Sync downloads from SABnzbd to database.
+        Calls arriving while a sync is running are coalesced into a single follow-up sync."""
+        if self._sync_running:
+            self._sync_pending = True
+            return
+
+        self._sync_running = True
+        try:
+            while True:
+                self._sync_pending = False
+                await self._sync_once(fetch_media_info, is_initial)
+                is_initial = False
+                if not self._sync_pending:
+                    break
+        finally:
+            self._sync_running = False
+
+    async def _sync_once(self, fetch_media_info: bool, is_initial: bool):
+        """Fetch SABnzbd queue + history and write them to the database."""
         try:
-            # Get queue and history from SABnzbd
-            queue_data = await self.sabnzbd.get_queue()
-            history_data = await self.sabnzbd.get_history()
+            # Get queue and history from SABnzbd (independent calls, so fetch them concurrently)
+            queue_data, history_data = await asyncio.gather(
+                self.sabnzbd.get_queue(),
+                self.sabnzbd.get_history()
+            )
 
             # Parse items
             queue_items = self.sabnzbd.parse_queue_items(queue_data)
             history_items = self.sabnzbd.parse_history_items(history_data)
 
-            all_items = queue_items + history_items
-
-            if not all_items:
-                print(f"{logger.timestamp()} ⚠️  No items from SABnzbd")
+            if not queue_items and not history_items:
+                logger.write(f"{logger.timestamp()} ⚠️  No items from SABnzbd")
                 return
 
             # Update database
-            async for session in db.get_session():
-                for item in all_items:
-                    await self._update_or_create_download(session, item, fetch_media_info)
+            async with db.writer_session() as session:
+                # New items get media info later from the poster background job
+                await self._upsert_downloads(session, queue_items)
+                await self._upsert_downloads(session, history_items)
 
                 # Clean up orphaned downloads (items in DB but no longer in SABnzbd)
                 # This handles cases where items were manually deleted or failed and removed from SABnzbd
-                await self._cleanup_orphaned_downloads(session, all_items)
+                await self._cleanup_orphaned_downloads(session, chain(queue_items, history_items))
 
                 await session.commit()
-
-            # Calculate stats
-            downloading_count = len([i for i in queue_items if i.get('status') == 'downloading'])
-            queued_count = len([i for i in queue_items if i.get('status') == 'queued'])
-            completed_count = len([i for i in history_items if not i.get('failed')])
+                await self.refresh_views(session)
+
+            # Calculate stats in one pass over the queue
+            downloading_count = queued_count = 0
+            active_download = None
+            for item in queue_items:
+                status = item.get('status')
+                if status == 'downloading':
+                    downloading_count += 1
+                    if active_download is None:
+                        active_download = item
+                elif status == 'queued':
+                    queued_count += 1
+            completed_count = sum(1 for i in history_items if not i.get('failed'))
 
             # Log based on context
             if is_initial:
                 # Initial sync - show full details
-                active_download = next((i for i in queue_items if i.get('status') == 'downloading'), None)
                 logger.initial_sync(downloading_count, queued_count, completed_count, active_download)
             else:
                 # Regular sync - only log changes
                 logger.sync_change(downloading_count, queued_count, completed_count)
 
         except aiohttp.ClientConnectorError as e:
-            print(f"{logger.timestamp()} ⚠️  Cannot connect to SABnzbd - check if it's running and config.yml is correct")
+            logger.write(f"{logger.timestamp()} ⚠️  Cannot connect to SABnzbd - check if it's running and config.yml is correct")
         except Exception as e:
-            print(f"{logger.timestamp()} ❌ Error syncing downloads: {e}")
-
-    async def _update_or_create_download(self, session: AsyncSession, item: Dict[str, Any], fetch_media_info: bool = True):
-        """Update or create a download record."""
-        # Check if download exists
-        result = await session.execute(
-            select(Download).where(Download.id == item["id"])
-        )
-        download = result.scalar_one_or_none()
-
-        if download:
-            # CRITICAL: Once an item is completed or failed, freeze it!
-            # Don't update from SABnzbd anymore - let it persist for 48h cleanup
-            if download.status in ['completed', 'failed']:
-                # Item already completed/failed - don't touch it
-                # It will persist until cleanup job removes it (48h later)
+            logger.write(f"{logger.timestamp()} ❌ Error syncing downloads: {e}")
+
+    async def _upsert_downloads(self, session: AsyncSession, items: List[Dict[str, Any]]):
+        """Insert new downloads and update active ones with INSERT ... ON CONFLICT DO UPDATE.
+        All items must share the same keys (one call for queue items, one for history items)."""
+        if not items:
+            return
+
+        now = datetime.utcnow()
+        rows = []
+        for item in items:
+            row = {key: item[key] for key in _DOWNLOAD_COLS.intersection(item)}
+            # Completed items from history keep SABnzbd's completion time, otherwise it's now
+            if row.get('status') == 'completed' and not row.get('completed_at'):
+                row['completed_at'] = now
+            rows.append(row)
+
+        update_keys = [key for key in rows[0] if key != 'id']
+
+        # Batched to stay well below SQLite's bound-parameter limit
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = sqlite_insert(Download).values(rows[start:start + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Download.id],
+                set_={**{key: stmt.excluded[key] for key in update_keys}, 'updated_at': now},
+                # CRITICAL: Once an item is completed or failed, freeze it!
+                # Don't update from SABnzbd anymore - let it persist for 48h cleanup
                 # This ensures "Recently Completed" shows items even if SABnzbd removes them
-                return
-
-            # Update active downloads (downloading/queued)
-            for key, value in item.items():
-                if hasattr(download, key):
-                    setattr(download, key, value)
-
-            download.updated_at = datetime.utcnow()
+                where=Download.status.notin_(['completed', 'failed'])
+            )
+            await session.execute(stmt)
 
-            # If this update marks it as completed, set completed_at timestamp
-            if item.get('status') == 'completed' and not download.completed_at:
-                download.completed_at = datetime.utcnow()
-
-        else:
-            # Create new
-            download = Download(id=item["id"])
-            for key, value in item.items():
-                if hasattr(download, key):
-                    setattr(download, key, value)
-
-            # Set completed_at if this is a completed item from history
-            if item.get('status') == 'completed' and item.get('completed_at'):
-                download.completed_at = item['completed_at']
-            elif item.get('status') == 'completed':
-                download.completed_at = datetime.utcnow()
-
-            # Mark for media info fetch (will be done by background job)
-            session.add(download)
-
-    async def _cleanup_orphaned_downloads(self, session: AsyncSession, current_items: List[Dict[str, Any]]):
+    async def _cleanup_orphaned_downloads(self, session: AsyncSession, current_items: Iterable[Dict[str, Any]]):
         """Remove downloads that are no longer in SABnzbd (manually deleted or failed and removed)."""
         # Get IDs of all items currently in SABnzbd
         sabnzbd_ids = {item['id'] for item in current_items}
 
-        # Get all active downloads (downloading/queued) from database
+        # Mark active downloads (downloading/queued) missing from SABnzbd as failed in one statement
+        now = datetime.utcnow()
         result = await session.execute(
-            select(Download).where(Download.status.in_(['downloading', 'queued']))
+            update(Download)
+            .where(
+                Download.status.in_(['downloading', 'queued']),
+                Download.id.notin_(list(sabnzbd_ids))
+            )
+            .values(
+                status='failed',
+                failed=True,
+                failure_reason='Removed from SABnzbd (manually deleted or failed)',
+                completed_at=now,
+                updated_at=now
+            )
+            .returning(Download.name)
         )
-        db_downloads = result.scalars().all()
-
-        # Find orphaned downloads (in DB but not in SABnzbd)
-        for download in db_downloads:
-            if download.id not in sabnzbd_ids:
-                # Item was removed from SABnzbd - mark as failed
-                download.status = 'failed'
-                download.failed = True
-                download.failure_reason = 'Removed from SABnzbd (manually deleted or failed)'
-                download.completed_at = datetime.utcnow()
-                download.updated_at = datetime.utcnow()
-                print(f"{logger.timestamp()} 🗑️  Cleaned up orphaned download: {download.name}")
+
+        ts = logger.timestamp()
+        for name in result.scalars():
+            logger.write(f"{ts} 🗑️  Cleaned up orphaned download: {name}")
 
     async def cleanup_completed(self):
         """Remove completed downloads older than configured hours."""
         try:
             cutoff_time = datetime.utcnow() - timedelta(hours=self.cleanup_hours)
 
-            async for session in db.get_session():
-                # First, get items that will be deleted
-                to_delete_result = await session.execute(
-                    select(Download).where(
+            async with db.writer_session() as session:
+                total_completed = (await session.execute(
+                    select(func.count()).select_from(Download).where(Download.status == "completed")
+                )).scalar_one()
+
+                # Delete expired rows, getting back only what the log needs
+                deleted_result = await session.execute(
+                    delete(Download)
+                    .where(
                         Download.status == "completed",
                         Download.completed_at < cutoff_time
                     )
+                    .returning(Download.name, Download.media_title, Download.completed_at)
                 )
-                to_delete = to_delete_result.scalars().all()
-
-                # Get total completed count
-                all_completed_result = await session.execute(
-                    select(Download).where(Download.status == "completed")
-                )
-                total_completed = len(all_completed_result.scalars().all())
+                to_delete = deleted_result.all()
 
                 if len(to_delete) > 0:
                     logger.cleanup_start(total_completed)
@@ -180,186 +305,211 @@ class SyncService:
                         name = item.media_title or item.name
                         removed_items.append(f"{name[:40]} (completed {hours_ago:.0f}h ago)")
 
-                    # Now delete them
-                    await session.execute(
-                        delete(Download).where(
-                            Download.status == "completed",
-                            Download.completed_at < cutoff_time
-                        )
-                    )
                     await session.commit()
+                    await self.refresh_views(session)
 
                     # Log results
                     kept_count = total_completed - len(to_delete)
                     logger.cleanup_complete(removed_items, kept_count)
 
         except Exception as e:
-            print(f"{logger.timestamp()} ❌ Error during cleanup: {e}")
-
-    async def get_all_downloads(self, session: AsyncSession) -> List[Download]:
-        """Get all downloads from database."""
-        result = await session.execute(select(Download))
-        return result.scalars().all()
-
-    async def get_downloads_by_status(self, session: AsyncSession, status: str) -> List[Download]:
-        """Get downloads by status."""
-        result = await session.execute(
-            select(Download).where(Download.status == status)
-        )
-        return result.scalars().all()
+            logger.write(f"{logger.timestamp()} ❌ Error during cleanup: {e}")
+
+    async def refresh_views(self, session: Optional[AsyncSession] = None):
+        """Rebuild the stats and download lists served by the API (opens a session if none given)."""
+        if session is None:
+            async with db.async_session() as session:
+                return await self.refresh_views(session)
+
+        await self.refresh_stats(session)
+        await self.refresh_snapshot(session)
+
+    async def refresh_snapshot(self, session: AsyncSession):
+        """Rebuild the serialized download lists, bucketed by status."""
+        downloads = await self.load_downloads(session)
+        snapshot = {"all": downloads}
+        for download in downloads:
+            snapshot.setdefault(download["status"], []).append(download)
+        # Encode once here rather than on every API poll; the ETag lets unchanged polls get a 304
+        encoded = {key: orjson.dumps(value) for key, value in snapshot.items()}
+        self.latest_snapshot_etags = {
+            key: f'"{hashlib.blake2b(data, digest_size=8).hexdigest()}"' for key, data in encoded.items()
+        }
+        self.latest_snapshot_json = encoded
+        self.latest_snapshot = snapshot
+
+    async def load_downloads(self, session: AsyncSession) -> List[Dict[str, Any]]:
+        """Load downloads as plain rows and serialize them without ORM hydration or re-validation.
+        Null fields are left out of the payload."""
+        stmt = select(*_RESPONSE_COLS).execution_options(yield_per=200)
+
+        # Rows identical to the previous load reuse their serialized dict
+        previous = self._serialized
+        current: Dict[str, Tuple[tuple, Dict[str, Any]]] = {}
+        downloads = []
+
+        # Changed rows are dumped together afterwards: (position in downloads, id, values, model)
+        pending: List[Tuple[int, str, tuple, DownloadResponse]] = []
+
+        result = await session.stream(stmt)
+        async for row in result:
+            values = tuple(row)
+            cached = previous.get(row.id)
+            if cached is not None and cached[0] == values:
+                current[row.id] = cached
+                downloads.append(cached[1])
+            else:
+                pending.append((len(downloads), row.id, values, DownloadResponse.model_construct(**row._mapping)))
+                downloads.append(None)
+
+        if pending:
+            # One list-level serializer call instead of a model_dump per row
+            payloads = _RESPONSE_LIST.dump_python([model for *_, model in pending], exclude_none=True)
+            for (position, download_id, values, _), payload in zip(pending, payloads):
+                current[download_id] = (values, payload)
+                downloads[position] = payload
+
+        # Entries for rows that no longer exist are dropped
+        self._serialized = current
+        return downloads
+
+    async def refresh_stats(self, session: AsyncSession):
+        """Recompute dashboard counters with one aggregate query."""
+
+        def count_where(condition):
+            return func.sum(case((condition, 1), else_=0))
+
+        # Single pass, single row: every counter is a conditional SUM
+        row = (await session.execute(
+            select(
+                count_where(Download.status == "downloading").label("downloading"),
+                count_where(Download.status == "queued").label("queued"),
+                count_where(Download.status == "completed").label("completed"),
+                count_where(Download.failed == True).label("failed"),
+                func.sum(case((Download.status == "downloading", Download.speed), else_=0)).label("total_speed"),
+            )
+        )).one()
+
+        # SUM() over an empty table is NULL
+        self.stats = {
+            "downloading": row.downloading or 0,
+            "queued": row.queued or 0,
+            "completed": row.completed or 0,
+            "failed": row.failed or 0,
+            "total_speed": round((row.total_speed or 0) / KIB_PER_MB, 2)  # KiB/s -> MB/s
+        }
 
     async def fetch_missing_media_info(self):
         """Fetch media info for downloads that don't have it yet (batched, prioritized)."""
         try:
-            async for session in db.get_session():
-                # Count items without posters that we haven't tried yet
-                downloading_result = await session.execute(
-                    select(Download)
-                    .where(Download.poster_url == None)
-                    .where(Download.poster_attempted == False)
-                    .where(Download.status == 'downloading')
-                )
-                downloading_without = len(downloading_result.scalars().all())
-
-                completed_result = await session.execute(
-                    select(Download)
-                    .where(Download.poster_url == None)
-                    .where(Download.poster_attempted == False)
-                    .where(Download.status == 'completed')
-                )
-                completed_without = len(completed_result.scalars().all())
-
-                queued_result = await session.execute(
-                    select(Download)
-                    .where(Download.poster_url == None)
-                    .where(Download.poster_attempted == False)
-                    .where(Download.status == 'queued')
-                )
-                queued_without = len(queued_result.scalars().all())
+            async with db.writer_session() as session:
+                # Count items without posters that we haven't tried yet, per status in one grouped query
+                counts = dict((await session.execute(_POSTER_COUNTS_STMT)).all())
+                downloading_without = counts.get('downloading', 0)
+                completed_without = counts.get('completed', 0)
+                queued_without = counts.get('queued', 0)
 
                 total_without = downloading_without + completed_without + queued_without
 
                 if total_without == 0:
                     return
 
-                # PRIORITY ORDER:
-                # 1. Downloading (#1) - most important, what's downloading NOW
-                # 2. Recently completed - what just finished
-                # 3. Queued (#2, #3, #4...) - fill in queue posters last
-
-                if downloading_without > 0:
-                    # Priority 1: Currently downloading item
-                    result = await session.execute(
-                        select(Download)
-                        .where(Download.poster_url == None)
-                        .where(Download.poster_attempted == False)
-                        .where(Download.status == 'downloading')
-                        .limit(5)  # Reduced from 20 to 5 to prevent job overlaps
-                    )
-                    downloads_without_info = result.scalars().all()
-                    fetch_type = "downloading"
-                    print(f"{logger.timestamp()} 🔍 Fetching posters for DOWNLOADING items ({len(downloads_without_info)} items)")
-
-                elif completed_without > 0:
-                    # Priority 2: Recently completed items (newest first)
-                    result = await session.execute(
-                        select(Download)
-                        .where(Download.poster_url == None)
-                        .where(Download.poster_attempted == False)
-                        .where(Download.status == 'completed')
-                        .order_by(Download.completed_at.desc())  # newest first
-                        .limit(5)  # Reduced from 20 to 5 to prevent job overlaps
-                    )
-                    downloads_without_info = result.scalars().all()
-                    fetch_type = "completed"
-                    print(f"{logger.timestamp()} 🔍 Fetching posters for COMPLETED items ({len(downloads_without_info)} items)")
-
-                elif queued_without > 0:
-                    # Priority 3: Queued items (by position #2, #3, #4...)
-                    result = await session.execute(
-                        select(Download)
-                        .where(Download.poster_url == None)
-                        .where(Download.poster_attempted == False)
-                        .where(Download.status == 'queued')
-                        .order_by(Download.queue_position.asc())  # #2, #3, #4...
-                        .limit(5)  # Reduced from 20 to 5 to prevent job overlaps
-                    )
-                    downloads_without_info = result.scalars().all()
-                    fetch_type = "queued"
-                    print(f"{logger.timestamp()} 🔍 Fetching posters for QUEUED items ({len(downloads_without_info)} items, positions {min([d.queue_position for d in downloads_without_info if d.queue_position])}-{max([d.queue_position for d in downloads_without_info if d.queue_position])})")
-
-                else:
-                    return
+                # Next batch in priority order (see _POSTER_BATCH_STMT)
+                downloads_without_info = (await session.execute(_POSTER_BATCH_STMT)).all()
 
                 if not downloads_without_info:
                     return
 
-                # Fetch posters
-                found_count = 0
-
-                for download in downloads_without_info:
-                    # Mark as attempted (whether we find it or not)
-                    download.poster_attempted = True
-
-                    try:
-                        # Pass category to help find the right instance
-                        media_info = await self.arr_manager.search_all(download.name, download.category)
-                        if media_info:
-                            download.media_type = media_info.get("media_type")
-                            download.media_title = media_info.get("media_title")
-                            download.poster_url = media_info.get("poster_url")
-                            download.year = media_info.get("year")
-                            download.arr_instance = media_info.get("arr_instance")
-                            found_count += 1
-                    except Exception as e:
-                        pass  # Already marked as attempted
+                # Mark as attempted (whether we find it or not) and release the writer
+                await session.execute(
+                    update(Download)
+                    .where(Download.id.in_([d.id for d in downloads_without_info]))
+                    .values(poster_attempted=True)
+                )
+                await session.commit()
+
+            # A short tier is topped up from the next, so a batch can mix statuses
+            positions = [d.queue_position for d in downloads_without_info if d.status == "queued" and d.queue_position]
+            span = f", queue positions {min(positions)}-{max(positions)}" if positions else ""
+            logger.write(f"{logger.timestamp()} 🔍 Fetching posters for {len(downloads_without_info)} items ({_status_breakdown(downloads_without_info)}{span})")
+
+            # Search the whole batch concurrently (category picks the right instance).
+            # No session is open here, so syncs and other writers aren't held up by Arr timeouts.
+            results = await asyncio.gather(
+                *(self.arr_manager.search_all(d.name, d.category) for d in downloads_without_info),
+                return_exceptions=True
+            )
+
+            matched = [
+                (download, media_info)
+                for download, media_info in zip(downloads_without_info, results)
+                if media_info and not isinstance(media_info, BaseException)
+            ]
+            if not matched:
+                return
 
+            # Second short write: one executemany UPDATE for the matches
+            # (rows removed meanwhile by cleanup simply match nothing)
+            async with db.writer_session() as session:
+                await session.execute(_POSTER_RESULT_STMT, [
+                    {
+                        "b_id": download.id,
+                        "media_type": media_info.get("media_type"),
+                        "media_title": media_info.get("media_title"),
+                        "poster_url": media_info.get("poster_url"),
+                        "year": media_info.get("year"),
+                        "arr_instance": media_info.get("arr_instance"),
+                    }
+                    for download, media_info in matched
+                ])
                 await session.commit()
+                await self.refresh_snapshot(session)
 
-                # Simple log output
-                if found_count > 0:
-                    remaining = downloading_without + completed_without + queued_without - len(downloads_without_info)
-                    print(f"{logger.timestamp()} 🖼️  Found {found_count} posters ({fetch_type}) • {remaining} remaining")
+            # Simple log output
+            remaining = total_without - len(downloads_without_info)
+            logger.write(f"{logger.timestamp()} 🖼️  Found {len(matched)} posters ({_status_breakdown(d for d, _ in matched)}) • {remaining} remaining")
 
         except Exception as e:
-            print(f"{logger.timestamp()} ❌ Error fetching media info: {e}")
+            logger.write(f"{logger.timestamp()} ❌ Error fetching media info: {e}")
 
     async def update_priority(self, download_id: str, priority: str) -> bool:
         """Update download priority in SABnzbd."""
-        try:
-            # Map priority names to SABnzbd values
-            # SABnzbd API: -1 = Low, 0 = Normal, 1 = High, 2 = Force
-            priority_map = {
-                "force": 2,
-                "high": 1,
-                "normal": 0,
-                "low": -1,
-            }
+        return await self.update_priority_bulk([download_id], priority)
 
-            priority_value = priority_map.get(priority.lower(), 0)
+    async def update_priority_bulk(self, download_ids: List[str], priority: str) -> bool:
+        """Update priority for several downloads with one SABnzbd call and one database UPDATE."""
+        try:
+            priority_value = _PRIORITY_MAP.get(priority.lower(), 0)
 
-            print(f"{logger.timestamp()} Setting priority for {download_id}: {priority} -> {priority_value}")
+            logger.write(f"{logger.timestamp()} Setting priority for {', '.join(download_ids)}: {priority} -> {priority_value}")
 
-            result = await self.sabnzbd.set_priority(download_id, priority_value)
-            print(f"{logger.timestamp()} SABnzbd response: {result}")
+            # SABnzbd first - the local row only changes once SABnzbd accepted it
+            # SABnzbd accepts a comma-separated list of NZO IDs
+            result = await self.sabnzbd.set_priority(",".join(download_ids), priority_value)
+            logger.write(f"{logger.timestamp()} SABnzbd response: {result}")
+            if not _priority_accepted(result):
+                logger.write(f"{logger.timestamp()} ❌ SABnzbd rejected the priority change")
+                return False
 
             # Update in database
-            async for session in db.get_session():
+            async with db.writer_session() as session:
                 db_result = await session.execute(
-                    select(Download).where(Download.id == download_id)
+                    update(Download)
+                    .where(Download.id.in_(download_ids))
+                    .values(priority=str(priority_value))  # Store numeric value
                 )
-                download = db_result.scalar_one_or_none()
+                await session.commit()
+                await self.refresh_snapshot(session)
+                updated = db_result.rowcount
 
-                if download:
-                    download.priority = str(priority_value)  # Store numeric value
-                    await session.commit()
-                    print(f"{logger.timestamp()} Updated priority in database")
-                else:
-                    print(f"{logger.timestamp()} Warning: Download {download_id} not found in database")
+            if updated == len(download_ids):
+                logger.write(f"{logger.timestamp()} Updated priority in database")
+            else:
+                logger.write(f"{logger.timestamp()} Warning: {len(download_ids) - updated} download(s) not found in database")
 
             return True
         except Exception as e:
-            print(f"{logger.timestamp()} ❌ Error updating priority: {e}")
+            logger.write(f"{logger.timestamp()} ❌ Error updating priority: {e}")
             import traceback
             traceback.print_exc()
             return False
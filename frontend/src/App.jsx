@@ -50,7 +50,7 @@ function App() {
 
   const completedDownloads = downloads
     .filter(d => d.status === 'completed' && !d.failed && filterDownloads(d))
-    .sort((a, b) => new Date(b.completed_at) - new Date(a.completed_at)) // Newest first (left to right)
+    .sort((a, b) => (b.completed_at || 0) - (a.completed_at || 0)) // Newest first (left to right), epoch ms
   const failedDownloads = downloads.filter(d => d.failed && filterDownloads(d))
 
   if (error || statsError) {
@@ -5,7 +5,7 @@ This will help us understand what status values SABnzbd really returns.
 """
 import asyncio
 import aiohttp
-import json
+import orjson
 from backend.config import get_config
 
 
@@ -31,7 +31,7 @@ async def debug_queue():
                 print(f"❌ Error: HTTP {response.status}")
                 return
 
-            data = await response.json()
+            data = orjson.loads(await response.read())
 
             # Print summary
             queue = data.get("queue", {})
@@ -79,8 +79,8 @@ async def debug_queue():
             print(f"💾 FULL RESPONSE SAVED")
             print("=" * 80)
 
-            with open('/home/user/SABnzbd-Media-Tracker/sab-queue-debug.json', 'w') as f:
-                json.dump(data, f, indent=2)
+            with open('/home/user/SABnzbd-Media-Tracker/sab-queue-debug.json', 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
             print("Full JSON response saved to: sab-queue-debug.json")
             print("You can inspect this file to see all fields SABnzbd returns.")
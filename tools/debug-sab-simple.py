@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """Simple debug script to check SABnzbd queue response."""
-import json
+import orjson
 import urllib.request
 import urllib.parse
 import yaml
@@ -25,7 +25,7 @@ print()
 
 # Fetch data
 with urllib.request.urlopen(f"{url}/api?{params}") as response:
-    data = json.loads(response.read())
+    data = orjson.loads(response.read())
 
 # Print summary
 queue = data.get("queue", {})
@@ -73,8 +73,8 @@ print("=" * 80)
 print(f"💾 FULL RESPONSE SAVED")
 print("=" * 80)
 
-with open('sab-queue-debug.json', 'w') as f:
-    json.dump(data, f, indent=2)
+with open('sab-queue-debug.json', 'wb') as f:
+    f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
 print("Full JSON response saved to: sab-queue-debug.json")
 print("You can inspect this file to see all fields SABnzbd returns.")
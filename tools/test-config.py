@@ -5,75 +5,118 @@ Run this to diagnose connection issues.
 """
 import asyncio
 import aiohttp
+import orjson
+import random
 import sys
 from pathlib import Path
+from typing import Any, List, Tuple
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from backend.config import get_config
 
+try:
+    import uvloop  # Optional faster event loop
+except ImportError:
+    uvloop = None
 
-async def test_sabnzbd(url: str, api_key: str):
-    """Test SABnzbd connection."""
-    print(f"  Testing SABnzbd at {url}...")
+# Timeout policy for every probe: separate connect/read budgets so a slow DNS
+# lookup or handshake doesn't eat the time allowed for the response, and dead
+# hosts fail after ~2s instead of the full 10s
+_PROBE_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=2, sock_connect=2, sock_read=5)
+
+# Tries per probe for transient failures (connection errors, timeouts, 5xx while a service restarts)
+_PROBE_ATTEMPTS = 3
+
+
+async def _get_json(session: aiohttp.ClientSession, url: str, **kwargs) -> Tuple[int, Any]:
+    """GET a URL and return (status, decoded JSON or None).
+    Transient failures are retried with jittered exponential backoff (~100ms, 200ms);
+    the last failure is raised (or its status returned) as-is."""
+    for attempt in range(_PROBE_ATTEMPTS):
+        last_attempt = attempt == _PROBE_ATTEMPTS - 1
+        try:
+            async with session.get(url, **kwargs) as response:
+                if response.status == 200:
+                    return 200, await response.json(loads=orjson.loads)
+                if response.status < 500 or last_attempt:
+                    return response.status, None
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if last_attempt:
+                raise
+        await asyncio.sleep(random.uniform(0, 0.1 * 2 ** attempt))
+
+
+async def test_sabnzbd(session: aiohttp.ClientSession, url: str, api_key: str) -> Tuple[bool, List[str]]:
+    """Test SABnzbd connection.
+    Returns (ok, report lines) - the lines are printed by the caller so concurrent probes don't interleave."""
+    lines = [f"  Testing SABnzbd at {url}..."]
 
     try:
+        # limit=1: the queue size comes from the noofslots_total counter, so one slot is enough.
+        # (mode=version would be lighter still, but it doesn't check the API key.)
         params = {
             "apikey": api_key,
             "output": "json",
-            "mode": "queue"
+            "mode": "queue",
+            "limit": 1
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{url}/api", params=params, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    print(f"    ✅ Connected successfully!")
-                    if "queue" in data:
-                        queue_size = len(data["queue"].get("slots", []))
-                        print(f"    📊 Queue has {queue_size} items")
-                    return True
-                else:
-                    print(f"    ❌ HTTP {response.status}")
-                    return False
+        status, data = await _get_json(session, f"{url}/api", params=params)
+        if status == 200:
+            lines.append(f"    ✅ Connected successfully!")
+            if "queue" in data:
+                queue = data["queue"]
+                queue_size = queue.get("noofslots_total", len(queue.get("slots", [])))
+                lines.append(f"    📊 Queue has {queue_size} items")
+            return True, lines
+        else:
+            lines.append(f"    ❌ HTTP {status}")
+            return False, lines
     except aiohttp.ClientConnectorError:
-        print(f"    ❌ Cannot connect - is SABnzbd running?")
-        return False
+        lines.append(f"    ❌ Cannot connect - is SABnzbd running?")
+        return False, lines
     except asyncio.TimeoutError:
-        print(f"    ❌ Connection timeout")
-        return False
+        lines.append(f"    ❌ Connection timeout")
+        return False, lines
     except Exception as e:
-        print(f"    ❌ Error: {e}")
-        return False
+        lines.append(f"    ❌ Error: {e}")
+        return False, lines
 
 
-async def test_arr(name: str, url: str, api_key: str, arr_type: str):
-    """Test Radarr/Sonarr connection."""
-    print(f"  Testing {name} ({arr_type}) at {url}...")
+async def test_arr(session: aiohttp.ClientSession, name: str, url: str, api_key: str, arr_type: str) -> Tuple[bool, List[str]]:
+    """Test Radarr/Sonarr connection.
+    Returns (ok, report lines) - the lines are printed by the caller so concurrent probes don't interleave."""
+    lines = [f"  Testing {name} ({arr_type}) at {url}..."]
 
     try:
         headers = {"X-Api-Key": api_key}
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{url}/api/v3/system/status", headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    version = data.get("version", "unknown")
-                    print(f"    ✅ Connected successfully! (v{version})")
-                    return True
-                else:
-                    print(f"    ❌ HTTP {response.status}")
-                    return False
+        status, data = await _get_json(session, f"{url}/api/v3/system/status", headers=headers)
+        if status == 200:
+            version = data.get("version", "unknown")
+            lines.append(f"    ✅ Connected successfully! (v{version})")
+            return True, lines
+        else:
+            lines.append(f"    ❌ HTTP {status}")
+            return False, lines
     except aiohttp.ClientConnectorError:
-        print(f"    ❌ Cannot connect - is {arr_type} running?")
-        return False
+        lines.append(f"    ❌ Cannot connect - is {arr_type} running?")
+        return False, lines
     except asyncio.TimeoutError:
-        print(f"    ❌ Connection timeout")
-        return False
+        lines.append(f"    ❌ Connection timeout")
+        return False, lines
     except Exception as e:
-        print(f"    ❌ Error: {e}")
-        return False
+        lines.append(f"    ❌ Error: {e}")
+        return False, lines
+
+
+def print_reports(results: List[Tuple[bool, List[str]]]) -> int:
+    """Print probe reports in order and return how many passed."""
+    for _, lines in results:
+        print("\n".join(lines))
+    return sum(1 for ok, _ in results if ok)
 
 
 async def main():
@@ -96,27 +139,32 @@ async def main():
         print(f"  ❌ Error loading config: {e}")
         return
 
-    # Test SABnzbd
+    # One session (and connection pool) for every check, all hosts probed at once
+    connector = aiohttp.TCPConnector(limit=64, limit_per_host=16, ttl_dns_cache=300, enable_cleanup_closed=True)
+    async with aiohttp.ClientSession(connector=connector, timeout=_PROBE_TIMEOUT) as session:
+        sabnzbd_result, radarr_results, sonarr_results = await asyncio.gather(
+            test_sabnzbd(session, config.sabnzbd.url, config.sabnzbd.api_key),
+            asyncio.gather(*(test_arr(session, r.name, r.url, r.api_key, "radarr") for r in config.radarr)),
+            asyncio.gather(*(test_arr(session, s.name, s.url, s.api_key, "sonarr") for s in config.sonarr)),
+        )
+
+    # Reports are printed after every probe finished, in config order
     print("🔧 Testing SABnzbd Connection:")
-    sabnzbd_ok = await test_sabnzbd(config.sabnzbd.url, config.sabnzbd.api_key)
+    sabnzbd_ok = print_reports([sabnzbd_result]) == 1
     print()
 
-    # Test Radarr instances
+    # Radarr instances
     radarr_ok = 0
     if config.radarr:
         print(f"🎬 Testing {len(config.radarr)} Radarr Instance(s):")
-        for radarr in config.radarr:
-            if await test_arr(radarr.name, radarr.url, radarr.api_key, "radarr"):
-                radarr_ok += 1
+        radarr_ok = print_reports(radarr_results)
         print()
 
-    # Test Sonarr instances
+    # Sonarr instances
     sonarr_ok = 0
     if config.sonarr:
         print(f"📺 Testing {len(config.sonarr)} Sonarr Instance(s):")
-        for sonarr in config.sonarr:
-            if await test_arr(sonarr.name, sonarr.url, sonarr.api_key, "sonarr"):
-                sonarr_ok += 1
+        sonarr_ok = print_reports(sonarr_results)
         print()
 
     # Summary
@@ -144,4 +192,5 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop.run when uvloop (>= 0.18) is installed, plain asyncio otherwise
+    getattr(uvloop, "run", asyncio.run)(main())